@@ -16,10 +16,29 @@ from utils.ui_components import (
 from utils.state_manager import (
     init_session_state,
     get_session_stats,
-    get_phase_status,
+    get_all_phase_statuses,
     clear_session_data
 )
 
+# Pipeline phases shown on the homepage: (number, title, description, icon, page)
+PHASES = (
+    (1, "Data Consolidation",
+     "Upload monthly data files, validate, and consolidate into a unified dataset.",
+     "📊", "1_📊_Data_Consolidation"),
+    (2, "Keywords & Categories",
+     "Generate SEO-friendly keywords using AI and categorize products automatically.",
+     "🔤", "2_🔤_Keywords_Categories"),
+    (3, "MSV Management",
+     "Monthly Search Volume data handling (managed by teammate Tenny).",
+     "📈", "3_📈_MSV_Management"),
+    (4, "Peak Analysis",
+     "Analyze peak popularity patterns and identify seasonal trends.",
+     "⭐", "4_⭐_Peak_Analysis"),
+    (5, "Insights & Analytics",
+     "Advanced analytics and insights from consolidated data (coming soon).",
+     "💡", "5_💡_Insights"),
+)
+
 # Page configuration
 st.set_page_config(
     page_title="Product Data Consolidation Pipeline",
@@ -35,10 +54,8 @@ init_session_state()
 apply_custom_css()
 
 
-def render_quick_stats():
+def render_quick_stats(stats):
     """Render quick stats dashboard if data exists"""
-    stats = get_session_stats()
-
     if stats:
         st.markdown("### 📊 Current Session Stats")
 
@@ -83,70 +100,25 @@ def render_phase_overview():
     st.markdown("### 🗺️ Pipeline Phases")
     st.markdown("Navigate through each phase of the data consolidation pipeline.")
 
-    # Row 1: Phase 1 and 2
-    col1, col2 = st.columns(2)
-
-    with col1:
-        render_phase_card(
-            phase_num=1,
-            title="Data Consolidation",
-            description="Upload monthly data files, validate, and consolidate into a unified dataset.",
-            status=get_phase_status(1),
-            icon="📊",
-            page_link="1_📊_Data_Consolidation"
-        )
-
-    with col2:
-        render_phase_card(
-            phase_num=2,
-            title="Keywords & Categories",
-            description="Generate SEO-friendly keywords using AI and categorize products automatically.",
-            status=get_phase_status(2),
-            icon="🔤",
-            page_link="2_🔤_Keywords_Categories"
-        )
-
-    # Row 2: Phase 3 and 4
-    col3, col4 = st.columns(2)
-
-    with col3:
-        render_phase_card(
-            phase_num=3,
-            title="MSV Management",
-            description="Monthly Search Volume data handling (managed by teammate Tenny).",
-            status=get_phase_status(3),
-            icon="📈",
-            page_link="3_📈_MSV_Management"
-        )
-
-    with col4:
-        render_phase_card(
-            phase_num=4,
-            title="Peak Analysis",
-            description="Analyze peak popularity patterns and identify seasonal trends.",
-            status=get_phase_status(4),
-            icon="⭐",
-            page_link="4_⭐_Peak_Analysis"
-        )
+    statuses = get_all_phase_statuses()
 
-    # Row 3: Phase 5
-    col5, _ = st.columns(2)
-
-    with col5:
-        render_phase_card(
-            phase_num=5,
-            title="Insights & Analytics",
-            description="Advanced analytics and insights from consolidated data (coming soon).",
-            status=get_phase_status(5),
-            icon="💡",
-            page_link="5_💡_Insights"
-        )
+    # Two cards per row
+    for row_start in range(0, len(PHASES), 2):
+        for col, phase in zip(st.columns(2), PHASES[row_start:row_start + 2]):
+            phase_num, title, description, icon, page_link = phase
+            with col:
+                render_phase_card(
+                    phase_num=phase_num,
+                    title=title,
+                    description=description,
+                    status=statuses[phase_num],
+                    icon=icon,
+                    page_link=page_link
+                )
 
 
-def render_getting_started():
+def render_getting_started(stats):
     """Render getting started guide for new users"""
-    stats = get_session_stats()
-
     if not stats:  # Only show for new users
         st.markdown("### 🚀 Getting Started")
 
@@ -170,6 +142,18 @@ def render_getting_started():
         """)
 
 
+@st.fragment
+def render_reset_button():
+    """
+    Render the session reset button.
+    As a fragment, the click only reruns this button before the single
+    full-app rerun that follows clearing the session.
+    """
+    if st.button("🔄 Start Fresh Session", help="Clear all data and start over"):
+        clear_session_data()
+        st.rerun(scope="app")
+
+
 def main():
     """Main homepage rendering"""
     render_header_navigation(current_page="Home")
@@ -188,9 +172,7 @@ def main():
         st.markdown("---")
 
         # Reset button
-        if st.button("🔄 Start Fresh Session", help="Clear all data and start over"):
-            clear_session_data()
-            st.rerun()
+        render_reset_button()
 
         st.markdown("---")
 
@@ -209,14 +191,17 @@ def main():
         st.markdown("- [View Documentation](PLAN.md)")
         st.markdown("- Product Types: BWS, Pets, Electronics")
 
+    # Session stats are read once and shared by the sections below
+    stats = get_session_stats()
+
     # Quick Stats (if data exists)
-    render_quick_stats()
+    render_quick_stats(stats)
 
     # Phase Overview
     render_phase_overview()
 
     # Getting Started (for new users)
-    render_getting_started()
+    render_getting_started(stats)
 
     # Footer
     render_custom_divider()
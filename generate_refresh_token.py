@@ -27,25 +27,14 @@ def main():
     print(f"[OK] Loaded Client Secret: {client_secret[:15]}...")
     print()
 
-    # Install required package
-    print("\n[INSTALL] Installing required package...")
-    import subprocess
-    import sys
+    # google-auth-oauthlib is listed in requirements.txt
     try:
-        subprocess.check_call(
-            [sys.executable, "-m", "pip", "install", "google-auth-oauthlib"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        print("[OK] Package installed successfully")
-    except subprocess.CalledProcessError:
-        print("[WARNING] Could not install package automatically")
+        from google_auth_oauthlib.flow import InstalledAppFlow
+    except ImportError:
+        print("\n[ERROR] google-auth-oauthlib is not installed!")
         print("Please run: pip install google-auth-oauthlib")
         return
 
-    # Import after installation
-    from google_auth_oauthlib.flow import InstalledAppFlow
-
     # OAuth2 scope for Google Ads API
     SCOPES = ['https://www.googleapis.com/auth/adwords']
 
@@ -9,12 +9,11 @@ from io import BytesIO
 import time
 
 # Import core modules
-from src.ingestion import load_monthly_data, get_month_order
+from src import get_google_api_key
+from src.ingestion import load_monthly_data, get_month_number, HAS_PYARROW
 from src.validation import validate_all_files
 from src.consolidation import consolidate_data
-from src.category_validator import CategoryValidator
 from src.taxonomy import load_all_categories, load_categories_for_product_type
-from src.llm_keywords import classify_other_products_batch, validate_api_key
 
 # Import UI utilities
 from utils.ui_components import (
@@ -25,13 +24,39 @@ from utils.ui_components import (
     render_custom_divider,
     render_info_banner,
     render_header_navigation,
-    render_summary_section
+    render_summary_section,
+    render_bar_chart,
+    make_throttled_progress
 )
 from utils.state_manager import (
     init_session_state,
     save_consolidation_results,
-    check_phase_prerequisites
+    check_phase_prerequisites,
+    get_data_version,
+    mark_data_changed
 )
+from utils.export import build_xlsx_bytes, category_level_counts
+
+# Product types offered for consolidation
+PRODUCT_TYPES = (
+    "Alcoholic Beverages",
+    "Pets",
+    "Electronics",
+    "F&F (Later)",
+    "Party & Celebration",
+    "Toys",
+    "Baby & Toddler",
+    "Health & Beauty",
+    "Sporting Goods",
+    "Home & Garden",
+    "Luggage & Bags",
+    "Furniture",
+    "Cameras & Optics",
+    "Hardware",
+)
+
+# Rows shown in the data preview table
+PREVIEW_ROWS = 1000
 
 # Page configuration
 st.set_page_config(
@@ -46,9 +71,75 @@ init_session_state()
 # Apply custom CSS
 apply_custom_css()
 
+
+@st.cache_data(show_spinner=False, max_entries=4, ttl=3600)
+def _load_and_validate(_zip_file, file_id: str):
+    """
+    Load and validate all monthly files from the uploaded ZIP.
+    Cached per upload (the uploader's file_id) so widget reruns never re-parse
+    the files; the upload buffer is read in place instead of being copied.
+
+    Returns:
+        Tuple of (monthly_data, load_errors, validation_errors)
+    """
+    _zip_file.seek(0)
+    monthly_data, load_errors = load_monthly_data(_zip_file)
+    if load_errors:
+        return monthly_data, load_errors, []
+
+    _, validation_errors = validate_all_files(monthly_data)
+    return monthly_data, load_errors, validation_errors
+
+
+@st.cache_data(show_spinner=False, max_entries=8, ttl=3600)
+def _consolidate(_zip_file, file_id: str, product_type: str) -> pd.DataFrame:
+    """Consolidate the uploaded ZIP for a product type (cached per upload + type)."""
+    monthly_data, _, _ = _load_and_validate(_zip_file, file_id)
+    return consolidate_data(monthly_data, product_type)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _summary_stats(_df: pd.DataFrame, data_version: str) -> dict:
+    """
+    Column scans behind the summary metrics and category breakdown.
+    Cached per data_version, so in-place category fixes invalidate the counts.
+
+    Returns:
+        Dict with 'available_count' and per-level 'l1_counts', 'l2_counts', 'l3_counts'
+    """
+    df = _df
+    stats = {}
+    if 'Availability' in df.columns:
+        stats['available_count'] = int((df['Availability'] != 'Potential Gap').sum())
+    for level, counts in category_level_counts(df, data_version).items():
+        stats[f'l{level}_counts'] = counts
+    return stats
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _build_parquet(_df: pd.DataFrame, data_version: str) -> bytes:
+    """Build the compact Parquet export (requires pyarrow; keyed like the xlsx)."""
+    output = BytesIO()
+    _df.to_parquet(output, engine='pyarrow', compression='zstd', index=False)
+    return output.getvalue()
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _get_category_validator(api_key: str):
+    """
+    One CategoryValidator (and Gemini model) per API key, reused across runs.
+    Keyed like get_gemini_client, so a rotated secret builds a fresh validator.
+    """
+    from src.category_validator import CategoryValidator
+
+    return CategoryValidator(api_key=api_key)
+
+
 def run_classification(consolidated_df: pd.DataFrame, product_type: str):
     """Run LLM classification for 'Other' products"""
-    
+    # Imported on demand: the Gemini SDK is only needed once an AI action runs
+    from src.llm_keywords import classify_other_products_batch, validate_api_key
+
     if not validate_api_key():
         st.error("❌ Google API Key not configured. Please add GOOGLE_API_KEY to your .env file.")
         return
@@ -72,6 +163,7 @@ def run_classification(consolidated_df: pd.DataFrame, product_type: str):
             )
         
         st.session_state.consolidated_df = updated_df
+        mark_data_changed()
         st.success("✅ Classification complete! Product categories updated.")
         
         # Rerun to show updated data
@@ -82,8 +174,16 @@ def run_classification(consolidated_df: pd.DataFrame, product_type: str):
         st.error(f"❌ Classification failed: {str(e)}")
 
 
-def validate_categories(consolidated_df: pd.DataFrame, product_type: str, is_test: bool = False):
+def validate_categories(
+    consolidated_df: pd.DataFrame,
+    product_type: str,
+    is_test: bool = False,
+    only_unrecognised: bool = False
+):
     """Validate and fix product categories using LLM"""
+    from src.category_validator import pick_batch_size
+    from src.llm_keywords import validate_api_key
+
     if not validate_api_key():
         st.error("❌ Google API Key not configured. Please add GOOGLE_API_KEY to your .env file.")
         return
@@ -91,14 +191,22 @@ def validate_categories(consolidated_df: pd.DataFrame, product_type: str, is_tes
     # Determine category column
     category_col = 'Product Category L3' if 'Product Category L3' in consolidated_df.columns else 'Product Category'
 
-    # Build product list for the validator
-    products = []
-    for idx, row in consolidated_df.iterrows():
-        products.append({
-            'title': str(row.get('Product Title', '')),
-            'brand': str(row.get('Product Brand', '')),
-            'assigned_category': str(row.get(category_col, 'Other')),
-        })
+    # Build product list for the validator (column-wise, no per-row Series)
+    def column_values(col, default):
+        if col not in consolidated_df.columns:
+            return [default] * len(consolidated_df)
+        # str() per value rather than astype(str): pandas' string dtype keeps
+        # missing values as NaN, and the prompts need plain strings
+        return [str(value) for value in consolidated_df[col].tolist()]
+
+    products = [
+        {'title': title, 'brand': brand, 'assigned_category': category}
+        for title, brand, category in zip(
+            column_values('Product Title', ''),
+            column_values('Product Brand', ''),
+            column_values(category_col, 'Other'),
+        )
+    ]
 
     available_categories = load_categories_for_product_type(product_type)
 
@@ -106,11 +214,20 @@ def validate_categories(consolidated_df: pd.DataFrame, product_type: str, is_tes
     progress_bar = st.progress(0)
     status_text = st.empty()
 
+    update_progress = make_throttled_progress(
+        progress_bar, status_text, "🔍 Validated batch {current} of {total}..."
+    )
+
     try:
         with st.spinner(f"🔍 Validating {label} categories with AI..."):
-            validator = CategoryValidator()
+            validator = _get_category_validator(get_google_api_key())
             validation_results = validator.validate_categories_batch(
-                products, available_categories, batch_size=20
+                products,
+                available_categories,
+                batch_size=pick_batch_size(len(products)),
+                max_workers=5,
+                progress_callback=update_progress,
+                only_unrecognised=only_unrecognised
             )
             report = validator.generate_validation_report(validation_results)
 
@@ -127,21 +244,27 @@ def validate_categories(consolidated_df: pd.DataFrame, product_type: str, is_tes
         # Show misclassifications and offer to apply corrections
         if report['misclassifications']:
             st.markdown("#### ⚠️ Suggested Corrections")
-            for item in report['misclassifications']:
-                st.info(
-                    f"**{item['title']}**\n"
-                    f"Assigned: `{item['assigned_category']}` → Suggested: `{item['llm_suggested_category']}` "
-                    f"(confidence: {item['confidence']})"
-                )
+            # One table instead of an info box per product (thousands on large runs)
+            corrections_df = pd.DataFrame.from_records(
+                report['misclassifications'],
+                columns=['title', 'assigned_category', 'llm_suggested_category', 'confidence']
+            ).rename(columns={
+                'title': 'Product',
+                'assigned_category': 'Assigned',
+                'llm_suggested_category': 'Suggested',
+                'confidence': 'Confidence'
+            })
+            corrections_df['Confidence'] = corrections_df['Confidence'].astype(str).str.upper()
+            st.dataframe(corrections_df, use_container_width=True, hide_index=True)
 
             if st.button("✅ Apply Suggested Corrections", type="primary"):
                 corrections = {item['title']: item['llm_suggested_category']
                                for item in report['misclassifications']}
                 df = st.session_state.consolidated_df
-                for idx, row in df.iterrows():
-                    title = str(row.get('Product Title', ''))
-                    if title in corrections:
-                        df.at[idx, category_col] = corrections[title]
+                # Hash lookup of every title in one pass, then write all fixes at once
+                suggested = df['Product Title'].astype(str).map(corrections)
+                to_fix = suggested.notna()
+                df.loc[to_fix, category_col] = suggested[to_fix]
                 st.session_state.consolidated_df = df
                 save_consolidation_results(product_type, {}, df)
                 st.success(f"✅ Applied {len(corrections)} corrections!")
@@ -155,24 +278,94 @@ def validate_categories(consolidated_df: pd.DataFrame, product_type: str, is_tes
 
 
 
+@st.fragment
+def render_data_preview(consolidated_df: pd.DataFrame):
+    """Column picker and preview table (reruns on its own when columns change)"""
+    st.subheader("📋 Data Preview")
+
+    # Column selector for preview
+    preview_columns = st.multiselect(
+        "Select columns to preview",
+        options=list(consolidated_df.columns),
+        default=[
+            'Product Title', 'Product Max Price',
+            'Product Category L1', 'Product Category L2', 'Product Category L3',
+            'Product Brand', 'Availability',
+            'Product Popularity Jan', 'Product Popularity Dec'
+        ]
+    )
+
+    # Only the leading rows are sent to the browser unless the user opts in;
+    # the full data is always in the export
+    show_all = False
+    if len(consolidated_df) > PREVIEW_ROWS:
+        show_all = st.toggle(f"Show all {len(consolidated_df):,} rows (slower)")
+    preview_df = consolidated_df if show_all else consolidated_df.head(PREVIEW_ROWS)
+
+    if preview_columns:
+        # Filter to only columns that exist
+        preview_columns = [col for col in preview_columns if col in consolidated_df.columns]
+        st.dataframe(
+            preview_df[preview_columns],
+            use_container_width=True,
+            height=400
+        )
+    else:
+        st.dataframe(preview_df, use_container_width=True, height=400)
+
+    if len(preview_df) < len(consolidated_df):
+        st.caption(
+            f"Showing the first {PREVIEW_ROWS:,} of {len(consolidated_df):,} products — "
+            "download the export below for the complete data."
+        )
+
+
+@st.fragment
+def render_export_buttons(consolidated_df: pd.DataFrame, product_type: str):
+    """Preliminary export downloads (clicks rerun only this fragment)"""
+    st.subheader("💾 Export Preliminary Results")
+
+    st.info("💡 You can export the consolidated data now, or proceed to Phase 2 to add keywords first.")
+
+    # Download button: the workbook is only built when the button is clicked
+    # (and then cached per DataFrame), not on every rerun of the page
+    filename = f"{product_type}_preliminary_consolidated.xlsx"
+    st.download_button(
+        label="📥 Download Preliminary Excel",
+        data=lambda: build_xlsx_bytes(consolidated_df, get_data_version()),
+        file_name=filename,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+    # Parquet is far smaller and quicker to produce for very large frames
+    # Parquet export is offered only when pyarrow is installed
+    if HAS_PYARROW:
+        st.download_button(
+            label="📥 Download as Parquet",
+            data=lambda: _build_parquet(consolidated_df, get_data_version()),
+            file_name=f"{product_type}_preliminary_consolidated.parquet",
+            mime="application/vnd.apache.parquet"
+        )
+
+
 def process_uploaded_file(uploaded_file, product_type: str):
     """Process the uploaded ZIP file and display results"""
 
     # Skip re-processing if already done for this exact file and product type.
     # Streamlit re-runs the script on every widget interaction (including button clicks),
     # so the file uploader still holds the previous file — guard against redundant work.
+    # The uploader's file_id changes on every new upload, even one with the same name.
     if (st.session_state.get('phase_1_complete', False)
-            and st.session_state.get('_uploaded_file_name') == uploaded_file.name
+            and st.session_state.get('_uploaded_file_id') == uploaded_file.file_id
             and st.session_state.get('product_type') == product_type):
         consolidated_df = st.session_state.consolidated_df
         st.success(f"✅ Loaded {len(consolidated_df)} unique products (cached)")
     else:
-        # Read uploaded file
-        zip_bytes = BytesIO(uploaded_file.read())
-
-        # Step 1: Load and parse files
+        # Step 1: Load and parse files (validation runs in the same cached step)
         with st.spinner("📂 Loading files from ZIP..."):
-            monthly_data, load_errors = load_monthly_data(zip_bytes)
+            monthly_data, load_errors, validation_errors = _load_and_validate(
+                uploaded_file, uploaded_file.file_id
+            )
 
         if load_errors:
             st.error("**File Loading Errors:**")
@@ -184,14 +377,11 @@ def process_uploaded_file(uploaded_file, product_type: str):
         st.success(f"✅ Loaded {len(monthly_data)} monthly files")
 
         # Show which months were loaded
-        months_loaded = sorted(monthly_data.keys(), key=lambda x: get_month_order().index(x))
+        months_loaded = sorted(monthly_data, key=get_month_number)
         st.info(f"📅 Months loaded: {', '.join(months_loaded)}")
 
         # Step 2: Validate files
-        with st.spinner("🔍 Validating data files..."):
-            is_valid, validation_errors = validate_all_files(monthly_data)
-
-        if not is_valid:
+        if validation_errors:
             st.error("**Validation Errors:**")
             for error in validation_errors:
                 st.error(f"• {error}")
@@ -201,7 +391,7 @@ def process_uploaded_file(uploaded_file, product_type: str):
 
         # Step 3: Consolidate data
         with st.spinner("🔄 Consolidating data..."):
-            consolidated_df = consolidate_data(monthly_data, product_type)
+            consolidated_df = _consolidate(uploaded_file, uploaded_file.file_id, product_type)
 
         if consolidated_df.empty:
             st.error("No data to consolidate. Please check your input files.")
@@ -211,7 +401,7 @@ def process_uploaded_file(uploaded_file, product_type: str):
 
         # Save to session state
         save_consolidation_results(product_type, monthly_data, consolidated_df)
-        st.session_state['_uploaded_file_name'] = uploaded_file.name
+        st.session_state['_uploaded_file_id'] = uploaded_file.file_id
 
     # Category Validation & Classification Section
     st.markdown("---")
@@ -219,8 +409,10 @@ def process_uploaded_file(uploaded_file, product_type: str):
 
     st.info("💡 Use AI to improve 'Other' categories and validate Level 3 assignments.")
 
+    stats = _summary_stats(consolidated_df, get_data_version())
+
     # 1. Classify "Other" Products (The new feature)
-    other_count = (consolidated_df['Product Category L3'] == 'Other').sum() if 'Product Category L3' in consolidated_df.columns else 0
+    other_count = stats['l3_counts'].get('Other', 0) if 'l3_counts' in stats else 0
     
     col_cls, col_brand = st.columns(2)
     
@@ -233,18 +425,17 @@ def process_uploaded_file(uploaded_file, product_type: str):
             st.success("✅ No 'Other' products found.")
 
     # 2. Extract Missing Brands (New Feature)
-    from src.llm_keywords import extract_brands_batch
-    
-    # Check for missing brands
-    def is_missing_brand(val):
-        return str(val).lower().strip() in ('', 'nan', 'none', 'null')
-        
-    missing_brand_count = consolidated_df['Product Brand'].apply(is_missing_brand).sum()
+    # Check for missing brands (blank, NaN or placeholder text)
+    brand = consolidated_df['Product Brand']
+    missing_brand = brand.isna() | brand.astype(str).str.strip().str.lower().isin(('', 'nan', 'none', 'null'))
+    missing_brand_count = int(missing_brand.sum())
 
     with col_brand:
         if missing_brand_count > 0:
             st.warning(f"⚠️ {missing_brand_count} products missing Brand.")
             if st.button(f"🏷️ Auto-Extract Missing Brands", type="primary", use_container_width=True):
+                from src.llm_keywords import extract_brands_batch, validate_api_key
+
                 if not validate_api_key():
                     st.error("❌ Google API Key not configured.")
                 else:
@@ -275,78 +466,34 @@ def process_uploaded_file(uploaded_file, product_type: str):
             st.success("✅ All products have brands.")
 
     st.markdown("#### Validation (Quality Check)")
-    
+
+    only_unrecognised = st.checkbox(
+        "⚡ Only check 'Other' and unrecognised categories",
+        value=False,
+        help="Skip products whose Level 3 category is already a known category for this product type (far fewer AI calls)"
+    )
+
     # Two buttons: Test with sample, or validate all
     col1, col2 = st.columns(2)
 
     with col1:
         if st.button("🧪 Test Validation (50 products)", type="secondary", use_container_width=True):
-            # Validate just first 50 products as a test
-            test_sample = consolidated_df.head(50).copy()
-            validate_categories(test_sample, product_type, is_test=True)
+            # Validate just first 50 products as a test (read-only, so no copy)
+            test_sample = consolidated_df.head(50)
+            validate_categories(test_sample, product_type, is_test=True, only_unrecognised=only_unrecognised)
 
     with col2:
         if st.button("🔎 Validate All Categories", type="secondary", use_container_width=True):
-            validate_categories(consolidated_df, product_type, is_test=False)
+            validate_categories(consolidated_df, product_type, is_test=False, only_unrecognised=only_unrecognised)
 
     # Display preview
     st.markdown("---")
 # ... (rest of file)
-    st.subheader("📋 Data Preview")
-
-    # Column selector for preview
-    preview_columns = st.multiselect(
-        "Select columns to preview",
-        options=list(consolidated_df.columns),
-        default=[
-            'Product Title', 'Product Max Price',
-            'Product Category L1', 'Product Category L2', 'Product Category L3',
-            'Product Brand', 'Availability',
-            'Product Popularity Jan', 'Product Popularity Dec'
-        ]
-    )
-
-    if preview_columns:
-        # Filter to only columns that exist
-        preview_columns = [col for col in preview_columns if col in consolidated_df.columns]
-        st.dataframe(
-            consolidated_df[preview_columns],
-            use_container_width=True,
-            height=400
-        )
-    else:
-        st.dataframe(consolidated_df, use_container_width=True, height=400)
+    render_data_preview(consolidated_df)
 
     # Export preliminary results
     st.markdown("---")
-    st.subheader("💾 Export Preliminary Results")
-
-    st.info("💡 You can export the consolidated data now, or proceed to Phase 2 to add keywords first.")
-
-    # Create Excel file for download
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        consolidated_df.to_excel(writer, index=False, sheet_name='Consolidated Data')
-
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Consolidated Data']
-        for idx, col in enumerate(consolidated_df.columns):
-            max_length = max(
-                consolidated_df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(idx, idx, min(max_length, 50))
-
-    output.seek(0)
-
-    # Download button
-    filename = f"{product_type}_preliminary_consolidated.xlsx"
-    st.download_button(
-        label="📥 Download Preliminary Excel",
-        data=output,
-        file_name=filename,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    render_export_buttons(consolidated_df, product_type)
 
     # Summary statistics
     render_custom_divider()
@@ -354,13 +501,11 @@ def process_uploaded_file(uploaded_file, product_type: str):
     # Build metrics dictionary
     metrics = {"Total Products": (len(consolidated_df), "📦")}
 
-    if 'Product Category L3' in consolidated_df.columns:
-        categories_l3 = consolidated_df['Product Category L3'].value_counts()
-        metrics["Categories (L3)"] = (len(categories_l3), "📁")
+    if 'l3_counts' in stats:
+        metrics["Categories (L3)"] = (len(stats['l3_counts']), "📁")
 
-    if 'Availability' in consolidated_df.columns:
-        available = (consolidated_df['Availability'] != 'Potential Gap').sum()
-        metrics["Available Products"] = (available, "✅")
+    if 'available_count' in stats:
+        metrics["Available Products"] = (stats['available_count'], "✅")
 
     # Render aligned summary
     render_summary_section("Summary Statistics", metrics, icon="📈")
@@ -372,21 +517,21 @@ def process_uploaded_file(uploaded_file, product_type: str):
         tab1, tab2, tab3 = st.tabs(["Level 1 (Main)", "Level 2 (Sub)", "Level 3 (Specific)"])
 
         with tab1:
-            l1_counts = consolidated_df['Product Category L1'].value_counts()
-            st.bar_chart(l1_counts)
+            l1_counts = stats['l1_counts']
+            render_bar_chart(l1_counts)
             st.caption(f"✅ L1 has {len(l1_counts)} main categories (never 'Other')")
 
         with tab2:
-            l2_counts = consolidated_df['Product Category L2'].value_counts()
-            st.bar_chart(l2_counts)
-            other_count = (consolidated_df['Product Category L2'] == 'Other').sum()
+            l2_counts = stats['l2_counts']
+            render_bar_chart(l2_counts)
+            other_count = l2_counts.get('Other', 0)
             if other_count > 0:
                 st.caption(f"ℹ️ {other_count} products have 'Other' at L2")
 
         with tab3:
-            l3_counts = consolidated_df['Product Category L3'].value_counts()
-            st.bar_chart(l3_counts)
-            other_count = (consolidated_df['Product Category L3'] == 'Other').sum()
+            l3_counts = stats['l3_counts']
+            render_bar_chart(l3_counts)
+            other_count = l3_counts.get('Other', 0)
             if other_count > 0:
                 st.caption(f"ℹ️ {other_count} products have 'Other' at L3")
 
@@ -435,22 +580,7 @@ def main():
 
     product_type = st.selectbox(
         "Select Product Type",
-        options=[
-            "Alcoholic Beverages",
-            "Pets",
-            "Electronics",
-            "F&F (Later)",
-            "Party & Celebration",
-            "Toys",
-            "Baby & Toddler",
-            "Health & Beauty",
-            "Sporting Goods",
-            "Home & Garden",
-            "Luggage & Bags",
-            "Furniture",
-            "Cameras & Optics",
-            "Hardware",
-        ],
+        options=PRODUCT_TYPES,
         help="Choose the product category for your data"
     )
 
@@ -5,21 +5,12 @@ Generate SEO-friendly keywords using AI and review product categorization
 
 import streamlit as st
 import pandas as pd
-from io import BytesIO
-from dotenv import load_dotenv
+import re
 
-# Load environment variables
-load_dotenv()
-
-# Import core modules
-from src.llm_keywords import (
-    generate_keywords_batch,
-    validate_api_key,
-    test_api_connection
-)
-from src.keyword_generator import verify_keywords_bulk
+# Import core modules (the Gemini-backed ones are imported where they are used)
 from src.rake_keywords import generate_keywords_rake
-from src.normalization import create_product_key
+from src.ingestion import read_data_file
+from src.normalization import map_product_keys
 
 # Import UI utilities
 from utils.ui_components import (
@@ -30,14 +21,26 @@ from utils.ui_components import (
     render_custom_divider,
     render_info_banner,
     render_header_navigation,
-    render_summary_section
+    render_summary_section,
+    render_bar_chart,
+    make_throttled_progress
 )
 from utils.state_manager import (
     init_session_state,
     save_keyword_results,
     check_phase_prerequisites,
-    get_consolidated_df
+    get_consolidated_df,
+    get_data_version
 )
+from utils.export import build_xlsx_bytes, category_level_counts
+
+# Rows per page when browsing every generated keyword
+KEYWORD_PAGE_SIZE = 25
+
+# Month columns in MSV uploads: Google Ads "Jan-23" and canonical "Jan 2023"
+_MONTH_NAMES = 'Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec'
+_MON_YY_COL = re.compile(rf'({_MONTH_NAMES})-(\d{{2}})')
+_MON_YEAR_COL = re.compile(rf'\s*({_MONTH_NAMES})\s+\d+\s*')
 
 # Page configuration
 st.set_page_config(
@@ -53,6 +56,29 @@ init_session_state()
 apply_custom_css()
 
 
+def _render_level_tab(level: int, level_counts: pd.Series, total: int, heading: str, show_other: bool = True):
+    """Bar chart plus top-5 metrics for one category level."""
+    st.markdown(heading)
+
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        render_bar_chart(level_counts)
+
+    with col2:
+        st.markdown(f"**Top L{level} Categories:**")
+        if show_other:
+            other_count = level_counts.get('Other', 0)
+            if other_count > 0:
+                st.info(f"ℹ️ {other_count} products have 'Other' at L{level}")
+
+        # Share of all products (blank categories included), computed in one pass
+        top = level_counts.head(5)
+        top_pct = top.div(total).mul(100)
+        for category, count, percentage in zip(top.index, top.values, top_pct.values):
+            st.metric(category, f"{count} ({percentage:.1f}%)")
+
+
 def render_category_overview():
     """Display category breakdown for L1, L2, L3"""
     consolidated_df = get_consolidated_df()
@@ -69,61 +95,25 @@ def render_category_overview():
 
     st.markdown("### 📁 Category Distribution")
 
+    # The charts resend their data to the browser on every rerun; hiding them
+    # keeps the keyword sections below responsive
+    if not st.toggle("Show category breakdown", value=True, key='show_category_overview'):
+        return
+
+    counts = category_level_counts(consolidated_df, get_data_version())
+
     # Create tabs for L1, L2, L3
     tab1, tab2, tab3 = st.tabs(["Level 1 (Main)", "Level 2 (Sub)", "Level 3 (Specific)"])
+    total = len(consolidated_df)
 
     with tab1:
-        st.markdown("**Level 1 Categories** (Broadest)")
-        l1_counts = consolidated_df['Product Category L1'].value_counts()
-
-        col1, col2 = st.columns([2, 1])
-
-        with col1:
-            st.bar_chart(l1_counts)
-
-        with col2:
-            st.markdown("**Top L1 Categories:**")
-            for category, count in l1_counts.head(5).items():
-                percentage = (count / len(consolidated_df)) * 100
-                st.metric(category, f"{count} ({percentage:.1f}%)")
+        _render_level_tab(1, counts[1], total, "**Level 1 Categories** (Broadest)", show_other=False)
 
     with tab2:
-        st.markdown("**Level 2 Categories** (Subcategories)")
-        l2_counts = consolidated_df['Product Category L2'].value_counts()
-
-        col1, col2 = st.columns([2, 1])
-
-        with col1:
-            st.bar_chart(l2_counts)
-
-        with col2:
-            st.markdown("**Top L2 Categories:**")
-            other_count = (consolidated_df['Product Category L2'] == 'Other').sum()
-            if other_count > 0:
-                st.info(f"ℹ️ {other_count} products have 'Other' at L2")
-
-            for category, count in l2_counts.head(5).items():
-                percentage = (count / len(consolidated_df)) * 100
-                st.metric(category, f"{count} ({percentage:.1f}%)")
+        _render_level_tab(2, counts[2], total, "**Level 2 Categories** (Subcategories)")
 
     with tab3:
-        st.markdown("**Level 3 Categories** (Most Specific)")
-        l3_counts = consolidated_df['Product Category L3'].value_counts()
-
-        col1, col2 = st.columns([2, 1])
-
-        with col1:
-            st.bar_chart(l3_counts)
-
-        with col2:
-            st.markdown("**Top L3 Categories:**")
-            other_count = (consolidated_df['Product Category L3'] == 'Other').sum()
-            if other_count > 0:
-                st.info(f"ℹ️ {other_count} products have 'Other' at L3")
-
-            for category, count in l3_counts.head(5).items():
-                percentage = (count / len(consolidated_df)) * 100
-                st.metric(category, f"{count} ({percentage:.1f}%)")
+        _render_level_tab(3, counts[3], total, "**Level 3 Categories** (Most Specific)")
 
 
 def render_keyword_generation():
@@ -168,9 +158,10 @@ def render_keyword_generation():
 
         if uploaded_kw_file is not None:
             try:
+                # xlsx goes through the Phase 1 reader (calamine when installed)
                 upload_df = (pd.read_csv(uploaded_kw_file)
                              if uploaded_kw_file.name.endswith('.csv')
-                             else pd.read_excel(uploaded_kw_file))
+                             else read_data_file(uploaded_kw_file, 'xlsx'))
 
                 # --- Google Ads column normalisation ---
                 _ga_rename = {}
@@ -183,16 +174,16 @@ def render_keyword_generation():
                     st.info(f"🔄 Google Ads format detected. Renamed: {_ga_rename}")
 
                 # --- Mon-YY date column normalisation (e.g. Jan-23 → Jan 2023) ---
-                _MONTHS = {'Jan','Feb','Mar','Apr','May','Jun',
-                           'Jul','Aug','Sep','Oct','Nov','Dec'}
+                # The same pass collects the monthly MSV columns (post-rename names)
                 _date_rename = {}
+                monthly_cols = []
                 for _c in upload_df.columns:
-                    _parts = str(_c).split('-')
-                    if (len(_parts) == 2
-                            and _parts[0] in _MONTHS
-                            and _parts[1].isdigit()
-                            and len(_parts[1]) == 2):
-                        _date_rename[_c] = f"{_parts[0]} {2000 + int(_parts[1])}"
+                    _m = _MON_YY_COL.fullmatch(str(_c))
+                    if _m:
+                        _date_rename[_c] = f"{_m[1]} {2000 + int(_m[2])}"
+                        monthly_cols.append(_date_rename[_c])
+                    elif _MON_YEAR_COL.fullmatch(str(_c)):
+                        monthly_cols.append(_c)
                 if _date_rename:
                     upload_df = upload_df.rename(columns=_date_rename)
                     st.info(f"🔄 Converted {len(_date_rename)} date columns to Mon YYYY format")
@@ -221,10 +212,6 @@ def render_keyword_generation():
                 st.success(f"✅ Loaded {len(upload_df)} rows")
 
                 # Detect MSV columns
-                monthly_cols = [c for c in upload_df.columns
-                                if len(str(c).split()) == 2
-                                and str(c).split()[0] in _MONTHS
-                                and str(c).split()[1].isdigit()]
                 has_avg_msv     = 'Product Keyword Avg MSV' in upload_df.columns
                 has_peak_season = 'Peak Seasonality' in upload_df.columns
                 has_msv         = has_avg_msv or len(monthly_cols) > 0
@@ -253,29 +240,26 @@ def render_keyword_generation():
                     if join_on_keyword:
                         # Case-insensitive join on Product Keyword (Google Ads path).
                         # Only bring in columns that don't already exist in consolidated_df.
-                        _cons = consolidated_df.copy()
-                        _up   = upload_df.copy()
-                        _cons['_jk'] = _cons['Product Keyword'].astype(str).str.lower().str.strip()
-                        _up['_jk']   = _up['Product Keyword'].astype(str).str.lower().str.strip()
+                        # Keys stay as standalone Series and the imported columns are
+                        # looked up per key; no temporary join column to add or drop.
+                        cons_jk = consolidated_df['Product Keyword'].astype(str).str.lower().str.strip()
+                        up_jk   = upload_df['Product Keyword'].astype(str).str.lower().str.strip()
 
                         cols_to_import = [c for c in upload_df.columns
                                          if c not in ('Product Keyword', '_jk')
                                          and c not in consolidated_df.columns]
-                        _up = _up[['_jk'] + cols_to_import].drop_duplicates('_jk')
+                        import_df = (upload_df[cols_to_import].assign(_jk=up_jk)
+                                     .drop_duplicates('_jk').set_index('_jk'))
 
-                        updated_df = _cons.merge(_up, on='_jk', how='left')
-                        updated_df = updated_df.drop(columns=['_jk'])
+                        updated_df = consolidated_df.assign(
+                            **{c: cons_jk.map(import_df[c]) for c in cols_to_import}
+                        )
                     else:
                         # Smart Join on Normalized Key (pre-filled CSV path).
                         # This allows "Jack Daniels" (CSV) to match "Jack Daniel's" (App)
                         
-                        # 1. Prepare Main Data with Match Key
-                        _cons = consolidated_df.copy()
-                        # Drop existing keyword col to overwrite it properly
-                        if 'Product Keyword' in _cons.columns:
-                            _cons = _cons.drop(columns=['Product Keyword'])
-                        
-                        _cons['_match_key'] = _cons['Product Title'].astype(str).apply(create_product_key)
+                        # 1. Match Key for Main Data (kept as a separate Series)
+                        cons_key = map_product_keys(consolidated_df['Product Title'].astype(str))
 
                         # 2. Identify cols to import
                         cols_to_import = [c for c in upload_df.columns
@@ -284,20 +268,19 @@ def render_keyword_generation():
                                          and (c not in consolidated_df.columns
                                               or c == 'Product Keyword')]
 
-                        # 3. Prepare Upload Data with Match Key
-                        _up = upload_df.copy()
-                        _up['_match_key'] = _up['Product Title'].astype(str).apply(create_product_key)
-                        
-                        # Select only relevant columns + match key
+                        # 3. Index Upload Data by Match Key
                         # Drop duplicates on the key to prevent explosion
-                        import_df = _up[['_match_key'] + cols_to_import].drop_duplicates('_match_key')
+                        up_key = map_product_keys(upload_df['Product Title'].astype(str))
+                        import_df = (upload_df[cols_to_import].assign(_match_key=up_key)
+                                     .drop_duplicates('_match_key').set_index('_match_key'))
+
+                        # 4. Look up each imported column; existing keyword col is overwritten
+                        updated_df = consolidated_df.drop(columns=['Product Keyword'], errors='ignore').assign(
+                            **{c: cons_key.map(import_df[c]) for c in cols_to_import}
+                        )
 
-                        # 4. Merge
-                        updated_df = _cons.merge(import_df, on='_match_key', how='left')
-                        
                         # 5. Cleanup
                         updated_df['Product Keyword'] = updated_df['Product Keyword'].fillna('')
-                        updated_df = updated_df.drop(columns=['_match_key'])
 
                     save_keyword_results(updated_df)
 
@@ -331,6 +314,8 @@ def render_keyword_generation():
     if use_rake:
         st.info("⚡ **RAKE Mode**: Instant keyword extraction using NLP. No API calls needed!")
     else:
+        from src.llm_keywords import validate_api_key, test_api_connection
+
         # API Key status for LLM mode
         if not validate_api_key():
             render_info_banner(
@@ -389,33 +374,38 @@ def render_keyword_generation():
     if st.button(button_label, type="primary"):
         progress_bar = st.progress(0)
         status_text = st.empty()
-
-        def update_progress(progress, current, total):
-            progress_bar.progress(progress)
-            status_text.text(f"Processing product {current} of {total}...")
+        update_progress = make_throttled_progress(
+            progress_bar, status_text, "Processing product {current} of {total}..."
+        )
 
         try:
             # Step 1: Generate keywords
             if use_rake:
                 # RAKE mode - instant, no API
                 with st.spinner("Generating keywords with RAKE..."):
-                    # Handle trial mode
+                    # Handle trial mode (generate_keywords_rake works on its
+                    # own copy, so the slice can be passed without copying)
                     if trial_mode and max_products:
-                        df_to_process = consolidated_df.head(max_products).copy()
+                        df_to_process = consolidated_df.head(max_products)
                     else:
-                        df_to_process = consolidated_df.copy()
+                        df_to_process = consolidated_df
                     
                     updated_df = generate_keywords_rake(
                         df_to_process,
                         progress_callback=update_progress
                     )
                     
-                    # Merge back if trial mode
+                    # Merge back if trial mode: write only the new keywords
+                    # into the session frame instead of copying all of it
                     if trial_mode and max_products:
-                        consolidated_df.update(updated_df)
-                        updated_df = consolidated_df.copy()
+                        if 'Product Keyword' not in consolidated_df.columns:
+                            consolidated_df['Product Keyword'] = ""
+                        consolidated_df.loc[updated_df.index, 'Product Keyword'] = updated_df['Product Keyword']
+                        updated_df = consolidated_df
             else:
                 # LLM mode
+                from src.llm_keywords import generate_keywords_batch
+
                 with st.spinner("Generating keywords with LLM..."):
                     updated_df = generate_keywords_batch(
                         consolidated_df,
@@ -454,12 +444,13 @@ def render_keyword_generation():
             st.error("No keywords found to verify. Generate or upload them first.")
             return
 
+        from src.keyword_generator import verify_keywords_bulk
+
         progress_bar_v = st.progress(0)
         status_text_v = st.empty()
-
-        def update_prog_v(pct, curr, total):
-            progress_bar_v.progress(pct)
-            status_text_v.text(f"Verifying {curr}/{total}...")
+        update_prog_v = make_throttled_progress(
+            progress_bar_v, status_text_v, "Verifying {current}/{total}..."
+        )
 
         try:
              # Run verification
@@ -500,15 +491,17 @@ def render_keyword_generation():
             st.error(f"Verification failed: {str(e)}")
 
 
+@st.fragment
 def render_keyword_preview():
-    """Display keyword quality preview"""
+    """Display keyword quality preview (browsing reruns only this fragment)"""
     consolidated_df = get_consolidated_df()
 
     if consolidated_df is None or 'Product Keyword' not in consolidated_df.columns:
         return
 
     # Count keywords
-    total_keywords = (consolidated_df['Product Keyword'] != '').sum()
+    has_keyword = consolidated_df['Product Keyword'] != ''
+    total_keywords = has_keyword.sum()
     total_products = len(consolidated_df)
 
     st.markdown("### 🔍 Keyword Preview")
@@ -521,9 +514,7 @@ def render_keyword_preview():
         st.metric("Completion Rate", f"{percentage:.1f}%")
 
     # Show sample keywords
-    with_keywords = consolidated_df[consolidated_df['Product Keyword'] != '']
-
-    if not with_keywords.empty:
+    if total_keywords > 0:
         st.markdown("**Sample Keywords:**")
         # Show L1, L2, L3 if available, otherwise show old single category
         display_cols = ['Product Title', 'Product Keyword']
@@ -532,18 +523,35 @@ def render_keyword_preview():
         elif 'Product Category' in consolidated_df.columns:
             display_cols.append('Product Category')
 
-        sample = with_keywords[display_cols].head(10)
-        st.dataframe(sample, use_container_width=True)
+        # Positions of products with keywords: slicing these picks only the rows
+        # shown, instead of filtering the whole frame and then taking a few
+        keyword_rows = has_keyword.to_numpy().nonzero()[0]
+
+        # Small fixed slices render as static tables (no interactive grid needed)
+        sample = consolidated_df.iloc[keyword_rows[:10]][display_cols]
+        st.table(sample)
+
+        # Opt-in browsing sends one page at a time, never the whole frame
+        if total_keywords > len(sample) and st.toggle("Browse all products with keywords", key='kw_browse'):
+            page_count = -(-int(total_keywords) // KEYWORD_PAGE_SIZE)
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key='kw_page')
+            start = (page - 1) * KEYWORD_PAGE_SIZE
+            st.dataframe(
+                consolidated_df.iloc[keyword_rows[start:start + KEYWORD_PAGE_SIZE]][display_cols],
+                use_container_width=True
+            )
+            st.caption(f"Page {page} of {page_count} ({total_keywords:,} products with keywords)")
 
     # Show Verification Sample if available
     if 'Keyword Fit' in consolidated_df.columns:
         st.markdown("**Verification Results Preview:**")
         v_cols = ['Product Title', 'Product Keyword', 'Keyword Fit', 'Keyword Fit Reason']
-        st.dataframe(consolidated_df[v_cols].head(10), use_container_width=True)
+        st.table(consolidated_df[v_cols].head(10))
 
 
+@st.fragment
 def render_export_section():
-    """Handle final data export"""
+    """Handle final data export (download clicks rerun only this fragment)"""
     consolidated_df = get_consolidated_df()
 
     if consolidated_df is None:
@@ -553,29 +561,14 @@ def render_export_section():
 
     st.info("💡 Download the complete consolidated dataset with keywords and categories.")
 
-    # Create Excel file for download
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        consolidated_df.to_excel(writer, index=False, sheet_name='Consolidated Data')
-
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Consolidated Data']
-        for idx, col in enumerate(consolidated_df.columns):
-            max_length = max(
-                consolidated_df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(idx, idx, min(max_length, 50))
-
-    output.seek(0)
-
-    # Download button
+    # Download button: the workbook is only built when the button is clicked
+    # (and then cached per DataFrame), not on every rerun of the page
     product_type = st.session_state.product_type or "Product"
     filename = f"{product_type}_consolidated_with_keywords.xlsx"
 
     st.download_button(
         label="📥 Download Complete Excel File",
-        data=output,
+        data=lambda: build_xlsx_bytes(consolidated_df, get_data_version()),
         file_name=filename,
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         type="primary"
@@ -8,10 +8,6 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 import time
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 from src.keyword_generator import verify_keyword_match, verify_keywords_bulk, get_gemini_client
 from src.llm_keywords import validate_api_key
@@ -8,17 +8,105 @@ Supports multiple validation strategies:
 3. Confidence-based - Only validate uncertain matches
 """
 
+import os
 import time
-from typing import List, Dict, Tuple
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from . import get_google_api_key
 
 
+# Transient API failures worth backing off and retrying (rate limit, timeout, overload)
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+)
+
+
+# Validation results from earlier runs, keyed by product + category list
+# (survives reruns, so "Test" followed by "Validate All" re-asks nothing).
+# Shared by every session and every taxonomy edit adds new keys, so it is a
+# locked LRU with a cap instead of a dict that only grows.
+VALIDATION_CACHE_SIZE = 20000
+_VALIDATION_CACHE: "OrderedDict[str, Dict]" = OrderedDict()
+_VALIDATION_CACHE_LOCK = threading.Lock()
+
+
+def _validation_cache_key(product: Dict, categories_key: str) -> str:
+    """Hash the fields that decide a validation answer."""
+    raw = "|".join((
+        categories_key,
+        str(product['title']),
+        str(product.get('brand', 'Unknown')),
+        str(product['assigned_category']),
+    ))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _get_cached_validation(key: str) -> Optional[Dict]:
+    """Return a copy of a cached result, marking it as recently used."""
+    with _VALIDATION_CACHE_LOCK:
+        result = _VALIDATION_CACHE.get(key)
+        if result is None:
+            return None
+        _VALIDATION_CACHE.move_to_end(key)
+        return dict(result)
+
+
+def _cache_validation(key: str, result: Dict):
+    """Store a result, evicting the least recently used beyond the cap."""
+    with _VALIDATION_CACHE_LOCK:
+        _VALIDATION_CACHE[key] = dict(result)
+        _VALIDATION_CACHE.move_to_end(key)
+        while len(_VALIDATION_CACHE) > VALIDATION_CACHE_SIZE:
+            _VALIDATION_CACHE.popitem(last=False)
+
+
+def clear_validation_cache():
+    """Clear cached validation results (useful for testing)."""
+    with _VALIDATION_CACHE_LOCK:
+        _VALIDATION_CACHE.clear()
+
+
+def pick_batch_size(total_products: int) -> int:
+    """
+    Choose how many products to validate per API call.
+
+    Larger prompts mean fewer round-trips against the rate limit; the
+    CAT_BATCH_SIZE environment variable overrides the default choice.
+
+    Args:
+        total_products: Number of products about to be validated
+
+    Returns:
+        Products per batch (50 below 1,000 products, 150 otherwise)
+    """
+    env_size = os.getenv("CAT_BATCH_SIZE", "").strip()
+    if env_size.isdigit() and int(env_size) > 0:
+        return int(env_size)
+
+    return 50 if total_products < 1000 else 150
+
+
 class CategoryValidator:
     """Validates product category assignments using LLM."""
 
-    def __init__(self, api_key: str = None):
-        """Initialize the validator with Gemini API."""
+    def __init__(self, api_key: str = None, timeout_s: float = 60, max_retries: int = 3):
+        """
+        Initialize the validator with Gemini API.
+
+        Args:
+            api_key: Gemini API key (defaults to GOOGLE_API_KEY)
+            timeout_s: Per-request timeout, so one stuck call cannot stall a run
+            max_retries: Attempts per batch on rate-limit or timeout errors
+        """
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
         self.api_key = api_key or get_google_api_key()
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment variables or Streamlit secrets")
@@ -32,18 +120,31 @@ class CategoryValidator:
         self,
         products: List[Dict],
         available_categories: List[str],
-        batch_size: int = 20
+        batch_size: int = 20,
+        max_workers: int = 5,
+        progress_callback=None,
+        only_unrecognised: bool = False
     ) -> List[Dict]:
         """
         Validate category assignments for a batch of products.
 
+        Batches are sent concurrently; the calls are network-bound, so a small
+        thread pool replaces the old fixed sleep between sequential requests.
+        Products validated before (same title, brand, category and category
+        list) are answered from the module cache without an API call.
+
         Args:
             products: List of dicts with 'title', 'brand', 'assigned_category'
             available_categories: List of valid category names
             batch_size: Number of products to process per API call
+            max_workers: Number of batches validated in parallel
+            progress_callback: Optional callback(progress, current, total)
+            only_unrecognised: Only send products assigned 'Other' or a category
+                outside available_categories; the rest are returned as correct
+                with confidence 'skipped'
 
         Returns:
-            List of dicts with validation results:
+            List of dicts with validation results (in input order):
             {
                 'title': str,
                 'assigned_category': str,
@@ -52,39 +153,85 @@ class CategoryValidator:
                 'confidence': str (high/medium/low)
             }
         """
-        results = []
-        total_batches = (len(products) + batch_size - 1) // batch_size
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        # Reuse answers from earlier runs; a changed category list changes every key
+        categories_key = hashlib.sha1("\n".join(sorted(available_categories)).encode('utf-8')).hexdigest()
+        keys = [_validation_cache_key(product, categories_key) for product in products]
+        results = [_get_cached_validation(key) for key in keys]
+
+        if only_unrecognised:
+            known = frozenset(available_categories) - {'Other'}
+            for idx, product in enumerate(products):
+                if results[idx] is None and product['assigned_category'] in known:
+                    results[idx] = {
+                        'title': product['title'],
+                        'assigned_category': product['assigned_category'],
+                        'llm_suggested_category': product['assigned_category'],
+                        'is_correct': True,
+                        'confidence': 'skipped'
+                    }
 
-        for i in range(0, len(products), batch_size):
-            batch = products[i:i + batch_size]
-            batch_num = i // batch_size + 1
+        # Identical products (same key) are sent once and the answer shared
+        duplicates: Dict[str, List[int]] = {}
+        for idx, result in enumerate(results):
+            if result is None:
+                duplicates.setdefault(keys[idx], []).append(idx)
+        pending = [indices[0] for indices in duplicates.values()]
 
-            print(f"Validating batch {batch_num}/{total_batches} ({len(batch)} products)...")
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        total_batches = len(batches)
 
+        def process_batch(batch_num, batch):
+            print(f"Validating batch {batch_num}/{total_batches} ({len(batch)} products)...")
             try:
-                batch_results = self._validate_batch(batch, available_categories)
-                results.extend(batch_results)
-
-                # Rate limiting between batches
-                if i + batch_size < len(products):
-                    time.sleep(2)
-
+                return self._validate_batch(batch, available_categories)
             except Exception as e:
                 print(f"Error validating batch {batch_num}: {e}")
                 # Add fallback results (assume correct if validation fails)
-                for product in batch:
-                    results.append({
-                        'title': product['title'],
-                        'assigned_category': product['assigned_category'],
-                        'llm_suggested_category': product['assigned_category'],
-                        'is_correct': True,
-                        'confidence': 'unknown',
-                        'error': str(e)
-                    })
+                return [{
+                    'title': product['title'],
+                    'assigned_category': product['assigned_category'],
+                    'llm_suggested_category': product['assigned_category'],
+                    'is_correct': True,
+                    'confidence': 'unknown',
+                    'error': str(e)
+                } for product in batch]
+
+        if not batches:
+            return results
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                executor.submit(process_batch, i + 1, [products[idx] for idx in batch]): batch
+                for i, batch in enumerate(batches)
+            }
+
+            completed = 0
+            for future in as_completed(futures):
+                for idx, result in zip(futures[future], future.result()):
+                    for same_idx in duplicates[keys[idx]]:
+                        results[same_idx] = dict(result)
+                    # Only keep real answers; fallbacks should be retried next time
+                    if result['confidence'] != 'unknown':
+                        _cache_validation(keys[idx], result)
+                completed += 1
+                if progress_callback:
+                    progress_callback(completed / total_batches, completed, total_batches)
+        finally:
+            # If the caller is interrupted (e.g. Streamlit's Stop button raising
+            # inside progress_callback), drop queued batches instead of waiting
+            executor.shutdown(wait=False, cancel_futures=True)
 
         return results
 
-    def _validate_batch(self, products: List[Dict], available_categories: List[str]) -> List[Dict]:
+    def _validate_batch(
+        self,
+        products: List[Dict],
+        available_categories: List[str],
+        retry_missing: bool = True
+    ) -> List[Dict]:
         """Validate a single batch of products."""
 
         # Build the prompt for batch validation
@@ -98,15 +245,43 @@ class CategoryValidator:
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
         ]
 
-        # Generate validation
-        response = self.model.generate_content(
-            prompt,
-            safety_settings=safety_settings
-        )
+        # One answer line is ~15 tokens; cap output so a runaway reply stays bounded
+        generation_config = {"max_output_tokens": max(1024, 32 * len(products))}
+
+        # Generate validation (bounded time per call, backoff on 429s/timeouts)
+        for attempt in range(self.max_retries):
+            try:
+                response = self.model.generate_content(
+                    prompt,
+                    safety_settings=safety_settings,
+                    generation_config=generation_config,
+                    request_options={"timeout": self.timeout_s}
+                )
+                break
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries - 1:
+                    raise
+                time.sleep(min(20, 2 ** attempt) + random.random())
 
         # Parse response
         results = self._parse_validation_response(response.text, products)
 
+        # Long answers occasionally stop early: re-send only the products the
+        # model skipped, once, instead of silently assuming they are correct
+        answered = self._index_response_lines(response.text)
+        missing = [idx for idx in range(len(products)) if idx + 1 not in answered]
+        if retry_missing and 0 < len(missing) < len(products):
+            try:
+                retried = self._validate_batch(
+                    [products[idx] for idx in missing], available_categories, retry_missing=False
+                )
+            except Exception as e:
+                # Keep the first pass; the skipped products keep their parse defaults
+                print(f"Re-asking {len(missing)} skipped products failed: {e}")
+                return results
+            for idx, result in zip(missing, retried):
+                results[idx] = result
+
         return results
 
     def _build_validation_prompt(self, products: List[Dict], available_categories: List[str]) -> str:
@@ -166,19 +341,26 @@ Validate all {len(products)} products now:"""
 
         return prompt
 
+    @staticmethod
+    def _index_response_lines(response_text: str) -> Dict[int, str]:
+        """Map each product number to its first '<n>|...' response line."""
+        lines = {}
+        for line in response_text.strip().split('\n'):
+            line = line.strip()
+            number = line.split('|', 1)[0]
+            if '|' in line and number.isdigit():
+                lines.setdefault(int(number), line)
+        return lines
+
     def _parse_validation_response(self, response_text: str, products: List[Dict]) -> List[Dict]:
         """Parse the LLM's validation response."""
 
         results = []
-        lines = response_text.strip().split('\n')
+        lines = self._index_response_lines(response_text)
 
         for idx, product in enumerate(products):
             # Find matching line for this product
-            matching_line = None
-            for line in lines:
-                if line.strip().startswith(f"{idx + 1}|"):
-                    matching_line = line.strip()
-                    break
+            matching_line = lines.get(idx + 1)
 
             if matching_line:
                 try:
@@ -5,7 +5,7 @@ Handles the pandas merge pipeline for consolidating monthly data.
 
 import pandas as pd
 from typing import Dict, List, Optional
-from .normalization import create_product_key, add_product_key_column, add_category_column, add_category_level_columns
+from .normalization import map_product_keys, add_product_key_column, add_category_column, add_category_level_columns
 from .validation import get_column_mapping, normalize_column_names
 from .ingestion import get_month_order
 
@@ -20,7 +20,7 @@ def build_master_product_list(monthly_data: Dict[str, pd.DataFrame]) -> pd.DataF
     Returns:
         DataFrame with unique products (product_key, Product Title, Brand)
     """
-    all_products = []
+    frames = []
 
     for month, df in monthly_data.items():
         df = normalize_column_names(df)
@@ -29,21 +29,23 @@ def build_master_product_list(monthly_data: Dict[str, pd.DataFrame]) -> pd.DataF
         title_col = col_mapping.get("Product Title", "Product Title")
         brand_col = col_mapping.get("Brand", "Brand")
 
+        # Without a title column no row can produce a product key
+        if title_col not in df.columns:
+            continue
+
         # Extract product info
-        for _, row in df.iterrows():
-            title = row.get(title_col, "")
-            brand = row.get(brand_col, "")
-            product_key = create_product_key(title)
+        frames.append(pd.DataFrame({
+            'product_key': map_product_keys(df[title_col]),
+            'Product Title': df[title_col],
+            'Product Brand': df[brand_col] if brand_col in df.columns else ""
+        }))
 
-            if product_key:  # Skip empty keys
-                all_products.append({
-                    'product_key': product_key,
-                    'Product Title': title,
-                    'Product Brand': brand
-                })
+    if not frames:
+        return pd.DataFrame(columns=['product_key', 'Product Title', 'Product Brand'])
 
-    # Create DataFrame and remove duplicates (keep first occurrence)
-    products_df = pd.DataFrame(all_products)
+    # Stack every month once, then skip empty keys
+    products_df = pd.concat(frames, ignore_index=True)
+    products_df = products_df[products_df['product_key'] != ""]
 
     if products_df.empty:
         return pd.DataFrame(columns=['product_key', 'Product Title', 'Product Brand'])
@@ -77,7 +79,7 @@ def get_monthly_popularity(monthly_data: Dict[str, pd.DataFrame], month: str) ->
 
     # Create product key and extract popularity
     result = pd.DataFrame({
-        'product_key': df[title_col].apply(create_product_key),
+        'product_key': map_product_keys(df[title_col]),
         f'Product Popularity {month}': df[popularity_col]
     })
 
@@ -109,7 +111,7 @@ def get_december_data(monthly_data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     avail_col = col_mapping.get("Availability", "Availability")
 
     result = pd.DataFrame({
-        'product_key': df[title_col].apply(create_product_key),
+        'product_key': map_product_keys(df[title_col]),
         'Product Max Price': df[price_col],
         'Availability': df[avail_col]
     })
@@ -214,14 +216,20 @@ def consolidate_data(monthly_data: Dict[str, pd.DataFrame], product_type: str) -
     )
 
     # Availability: If empty, set to "Potential Gap"
-    master_df['Availability'] = master_df['Availability'].apply(
-        lambda x: x if pd.notna(x) and str(x).strip() != "" else "Potential Gap"
-    )
+    # (kept as plain strings like the other text columns: the export sanitizer
+    # and the CSV session cache both assume object/str columns)
+    availability = master_df['Availability']
+    is_gap = availability.isna() | (availability.astype(str).str.strip() == "")
+    master_df['Availability'] = availability.mask(is_gap, "Potential Gap")
 
     # Step 4: Merge monthly popularity data
-    for month in months:
-        month_popularity = get_monthly_popularity(monthly_data, month)
-        master_df = master_df.merge(month_popularity, on='product_key', how='left')
+    # Align every month on product_key and join once, instead of growing
+    # master_df through twelve successive merges
+    month_popularity = pd.concat(
+        [get_monthly_popularity(monthly_data, month).set_index('product_key') for month in months],
+        axis=1
+    )
+    master_df = master_df.join(month_popularity, on='product_key')
 
     # Step 5: Calculate Peak Popularity
     master_df['Peak Popularity'] = master_df.apply(
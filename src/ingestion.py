@@ -3,12 +3,27 @@ File Ingestion Module
 Handles ZIP file extraction and reading CSV/Excel files.
 """
 
+import os
 import zipfile
 import pandas as pd
 from io import BytesIO
 from typing import Dict, Tuple, Optional
 import re
 
+# python-calamine (optional) parses .xlsx in Rust, much faster than openpyxl
+try:
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+# pyarrow (optional) gives a single-pass CSV reader for well-formed exports
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
 
 # Valid month names for filename parsing
 VALID_MONTHS = [
@@ -40,36 +55,50 @@ MONTH_ALIASES = {
 }
 
 
-def extract_files_from_zip(zip_file: BytesIO) -> Dict[str, BytesIO]:
+def list_zip_members(zf: zipfile.ZipFile) -> Dict[str, str]:
     """
-    Extract all files from a ZIP archive.
+    List the data files inside an open ZIP archive without reading them.
 
     Args:
-        zip_file: BytesIO object containing the ZIP file
+        zf: Open ZipFile
 
     Returns:
-        Dictionary mapping filename to file content as BytesIO
+        Dictionary mapping base filename to archive member name
     """
-    extracted_files = {}
+    members = {}
 
-    with zipfile.ZipFile(zip_file, 'r') as zf:
-        for filename in zf.namelist():
-            # Skip directories and hidden files
-            if filename.endswith('/') or filename.startswith('__MACOSX'):
-                continue
+    for filename in zf.namelist():
+        # Skip directories and hidden files
+        if filename.endswith('/') or filename.startswith('__MACOSX'):
+            continue
 
-            # Get just the filename without path
-            base_filename = filename.split('/')[-1]
+        # Get just the filename without path
+        base_filename = filename.split('/')[-1]
 
-            # Skip hidden files
-            if base_filename.startswith('.'):
-                continue
+        # Skip hidden files
+        if base_filename.startswith('.'):
+            continue
 
-            # Read file content
-            file_content = BytesIO(zf.read(filename))
-            extracted_files[base_filename] = file_content
+        members[base_filename] = filename
 
-    return extracted_files
+    return members
+
+
+def extract_files_from_zip(zip_file: BytesIO) -> Dict[str, BytesIO]:
+    """
+    Extract all files from a ZIP archive.
+
+    Args:
+        zip_file: BytesIO object containing the ZIP file
+
+    Returns:
+        Dictionary mapping filename to file content as BytesIO
+    """
+    with zipfile.ZipFile(zip_file, 'r') as zf:
+        return {
+            base_filename: BytesIO(zf.read(filename))
+            for base_filename, filename in list_zip_members(zf).items()
+        }
 
 
 def parse_filename(filename: str) -> Tuple[Optional[str], Optional[int], Optional[str]]:
@@ -122,6 +151,95 @@ def parse_filename(filename: str) -> Tuple[Optional[str], Optional[int], Optiona
     return month_name, year, extension
 
 
+# Columns every monthly export is expected to have (lowercased)
+EXPECTED_CSV_COLUMNS = ['popularity rank', 'title', 'brand', 'availability', 'price range max']
+
+
+def _clean_and_score_csv(df: pd.DataFrame) -> Tuple[pd.DataFrame, int, int]:
+    """
+    Strip null bytes/BOMs from a parsed CSV and score how plausible the parse is.
+
+    Returns:
+        Tuple of (cleaned DataFrame, score, expected-column matches).
+        Score is 0 if the parse is unusable.
+    """
+    # Clean column names (remove null bytes and BOM if present)
+    df.columns = [
+        col.replace('\x00', '').replace('\ufeff', '').replace('\ufffe', '').replace('\xff\xfe', '').replace('\xfe\xff', '').strip() if isinstance(col, str) else col
+        for col in df.columns
+    ]
+
+    # Clean all string data (remove null bytes from values)
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].apply(
+                lambda x: x.replace('\x00', '').strip() if isinstance(x, str) else x
+            )
+
+    # Check if columns look reasonable (no null bytes remaining)
+    has_good_columns = all(
+        '\x00' not in str(col) for col in df.columns
+    )
+
+    # Score this attempt based on column name matching
+    # Prioritize versions that have expected column names
+    if df.empty or len(df.columns) <= 1 or not has_good_columns:
+        return df, 0, 0
+
+    # Check how many expected columns are present
+    col_names_lower = [str(col).lower().strip() for col in df.columns]
+
+    # Check if each expected column is present (allows for trailing punctuation)
+    matches = 0
+    for expected in EXPECTED_CSV_COLUMNS:
+        # Check for exact match or match with trailing period
+        if expected in col_names_lower or f"{expected}." in col_names_lower:
+            matches += 1
+
+    # Score heavily weighted by column name matches
+    # Each expected column match = 1000 points
+    # Number of columns = 10 points
+    # Number of rows = 1 point
+    score = (matches * 1000) + (len(df.columns) * 10) + len(df)
+    return df, score, matches
+
+
+def _read_csv_fast(file_content: BytesIO) -> Optional[pd.DataFrame]:
+    """
+    Single-pass CSV read with the pyarrow engine for well-formed exports.
+
+    Encoding comes from the BOM and the delimiter from the header line.
+    Returns None unless every expected column is found, so anything
+    unusual (extra title rows, odd encodings) goes to the full search.
+    """
+    file_content.seek(0)
+    raw = file_content.read()
+
+    if raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+        encoding = 'utf-16'
+    elif raw.startswith(b'\xef\xbb\xbf'):
+        encoding = 'utf-8-sig'
+    else:
+        encoding = 'utf-8'
+
+    # pyarrow hands back undecodable text as bytes, so check the encoding here
+    try:
+        header = raw.decode(encoding).splitlines()[0]
+    except (UnicodeDecodeError, IndexError):
+        return None
+    delimiter = max(['\t', ',', ';', '|'], key=header.count)
+
+    try:
+        df = pd.read_csv(BytesIO(raw), encoding=encoding, sep=delimiter, engine='pyarrow')
+    except Exception:
+        return None
+
+    df, _, matches = _clean_and_score_csv(df)
+    if matches < len(EXPECTED_CSV_COLUMNS):
+        return None
+    return df
+
+
 def read_data_file(file_content: BytesIO, extension: str) -> pd.DataFrame:
     """
     Read a CSV or Excel file into a pandas DataFrame.
@@ -138,6 +256,12 @@ def read_data_file(file_content: BytesIO, extension: str) -> pd.DataFrame:
     file_content.seek(0)  # Reset file pointer
 
     if extension == 'csv':
+        # Well-formed exports parse in one pyarrow pass
+        if HAS_PYARROW:
+            df = _read_csv_fast(file_content)
+            if df is not None:
+                return df
+
         # Try multiple encodings and delimiters for CSV files
         encodings_to_try = ['utf-16', 'utf-8', 'utf-16-le', 'utf-16-be', 'latin-1', 'cp1252']
         delimiters_to_try = ['\t', ',', ';', '|']
@@ -159,47 +283,10 @@ def read_data_file(file_content: BytesIO, extension: str) -> pd.DataFrame:
                             engine='python'  # Use Python engine for better error handling
                         )
 
-                        # Clean column names (remove null bytes and BOM if present)
-                        df.columns = [
-                            col.replace('\x00', '').replace('\ufeff', '').replace('\ufffe', '').replace('\xff\xfe', '').replace('\xfe\xff', '').strip() if isinstance(col, str) else col
-                            for col in df.columns
-                        ]
-
-                        # Clean all string data (remove null bytes from values)
-                        for col in df.columns:
-                            if df[col].dtype == 'object':
-                                df[col] = df[col].apply(
-                                    lambda x: x.replace('\x00', '').strip() if isinstance(x, str) else x
-                                )
-
-                        # Check if columns look reasonable (no null bytes remaining)
-                        has_good_columns = all(
-                            '\x00' not in str(col) for col in df.columns
-                        )
-
-                        # Score this attempt based on column name matching
-                        # Prioritize versions that have expected column names
-                        if not df.empty and len(df.columns) > 1 and has_good_columns:
-                            # Check how many expected columns are present
-                            expected_cols = ['popularity rank', 'title', 'brand', 'availability', 'price range max']
-                            col_names_lower = [str(col).lower().strip() for col in df.columns]
-
-                            # Check if each expected column is present (allows for trailing punctuation)
-                            matches = 0
-                            for expected in expected_cols:
-                                # Check for exact match or match with trailing period
-                                if expected in col_names_lower or f"{expected}." in col_names_lower:
-                                    matches += 1
-
-                            # Score heavily weighted by column name matches
-                            # Each expected column match = 1000 points
-                            # Number of columns = 10 points
-                            # Number of rows = 1 point
-                            score = (matches * 1000) + (len(df.columns) * 10) + len(df)
-
-                            if score > best_score:
-                                best_df = df
-                                best_score = score
+                        df, score, _ = _clean_and_score_csv(df)
+                        if score > best_score:
+                            best_df = df
+                            best_score = score
 
                     except (UnicodeDecodeError, UnicodeError):
                         continue
@@ -212,6 +299,13 @@ def read_data_file(file_content: BytesIO, extension: str) -> pd.DataFrame:
             raise ValueError("Could not decode CSV file with any supported encoding or delimiter")
 
     elif extension == 'xlsx':
+        if HAS_CALAMINE:
+            try:
+                return pd.read_excel(file_content, engine='calamine')
+            except ValueError:
+                # pandas < 2.2 has no calamine engine
+                file_content.seek(0)
+        # pandas opens the workbook read-only with cached values (no full DOM)
         return pd.read_excel(file_content, engine='openpyxl')
     else:
         raise ValueError(f"Unsupported file extension: {extension}")
@@ -222,41 +316,65 @@ def load_monthly_data(zip_file: BytesIO) -> Tuple[Dict[str, pd.DataFrame], list]
     Load all monthly data files from a ZIP archive.
 
     Args:
-        zip_file: BytesIO object containing the ZIP file
+        zip_file: ZIP file path or file-like object (read member by member)
 
     Returns:
         Tuple of:
         - Dictionary mapping month name to DataFrame
         - List of error messages (empty if all valid)
     """
+    from concurrent.futures import ThreadPoolExecutor
+
     errors = []
     monthly_data = {}
 
-    # Extract all files from ZIP
-    extracted_files = extract_files_from_zip(zip_file)
+    with zipfile.ZipFile(zip_file, 'r') as zf:
+        members = list_zip_members(zf)
 
-    if not extracted_files:
-        errors.append("No valid files found in ZIP archive")
-        return monthly_data, errors
+        if not members:
+            errors.append("No valid files found in ZIP archive")
+            return monthly_data, errors
 
-    for filename, file_content in extracted_files.items():
-        # Parse filename
-        month_name, year, extension = parse_filename(filename)
+        # Resolve months from filenames first so only valid files get parsed
+        jobs = []
+        seen_months = set()
+        for filename, member in members.items():
+            # Parse filename
+            month_name, year, extension = parse_filename(filename)
 
-        if month_name is None:
-            errors.append(f"Invalid filename format: '{filename}'. Expected formats: 'Mon-YYYY.xlsx', 'Mon YYYY.csv', or 'Prefix Mon YYYY.csv'")
-            continue
+            if month_name is None:
+                errors.append(f"Invalid filename format: '{filename}'. Expected formats: 'Mon-YYYY.xlsx', 'Mon YYYY.csv', or 'Prefix Mon YYYY.csv'")
+                continue
 
-        # Check for duplicate months
-        if month_name in monthly_data:
-            errors.append(f"Duplicate file for month: {month_name}")
-            continue
+            # Check for duplicate months
+            if month_name in seen_months:
+                errors.append(f"Duplicate file for month: {month_name}")
+                continue
 
-        try:
-            df = read_data_file(file_content, extension)
-            monthly_data[month_name] = df
-        except Exception as e:
-            errors.append(f"Error reading '{filename}': {str(e)}")
+            seen_months.add(month_name)
+            jobs.append((filename, member, month_name, extension))
+
+        def parse_member(job):
+            """Read one archive member; errors are returned, not raised."""
+            filename, member, month_name, extension = job
+            try:
+                # Decompress one member per worker so only the files being
+                # parsed are held alongside the DataFrames. ZipFile guards
+                # the shared handle with a lock for reads, so concurrent
+                # zf.read() calls are safe and inflate in parallel
+                return month_name, read_data_file(BytesIO(zf.read(member)), extension), None
+            except Exception as e:
+                return month_name, None, f"Error reading '{filename}': {str(e)}"
+
+        if jobs:
+            max_workers = min(len(jobs), 12, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # map() keeps archive order for the results and error messages
+                for month_name, df, error in executor.map(parse_member, jobs):
+                    if error:
+                        errors.append(error)
+                    else:
+                        monthly_data[month_name] = df
 
     return monthly_data, errors
 
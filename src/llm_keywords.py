@@ -5,8 +5,10 @@ Refactored for High-Speed Batch Processing.
 """
 
 import os
+import threading
 import pandas as pd
-from typing import Optional, List, Dict
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
 import google.generativeai as genai
 import time
 import json
@@ -21,23 +23,71 @@ class QuotaExceededError(Exception):
     pass
 
 
+# Keywords from earlier batch runs, keyed by (model_name, title, brand) as sent
+# in the prompt (survives reruns, so growing the trial size only pays for the
+# new products, while switching models asks the new model again).
+# Shared by every session in the process, so it is a locked LRU with a cap.
+KEYWORD_CACHE_SIZE = 20000
+_KEYWORD_CACHE: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_KEYWORD_CACHE_LOCK = threading.Lock()
+
+# Gemini clients keyed by (api_key, model_name); keying on the key means a
+# rotated secret gets a fresh client instead of a stale one
+_CLIENT_CACHE: Dict[Tuple[str, str], "genai.GenerativeModel"] = {}
+
+
+def _get_cached_keyword(key: Tuple[str, str, str]) -> Optional[str]:
+    """Look up a cached keyword, marking it as recently used."""
+    with _KEYWORD_CACHE_LOCK:
+        keyword = _KEYWORD_CACHE.get(key)
+        if keyword is not None:
+            _KEYWORD_CACHE.move_to_end(key)
+        return keyword
+
+
+def _cache_keyword(key: Tuple[str, str, str], keyword: str):
+    """Store a keyword, evicting the least recently used beyond the cap."""
+    with _KEYWORD_CACHE_LOCK:
+        _KEYWORD_CACHE[key] = keyword
+        _KEYWORD_CACHE.move_to_end(key)
+        while len(_KEYWORD_CACHE) > KEYWORD_CACHE_SIZE:
+            _KEYWORD_CACHE.popitem(last=False)
+
+
+def clear_keyword_cache():
+    """Clear cached keyword results (useful for testing)."""
+    with _KEYWORD_CACHE_LOCK:
+        _KEYWORD_CACHE.clear()
+
+
+def clear_client_cache():
+    """Drop cached Gemini clients (e.g. after changing the API key)."""
+    _CLIENT_CACHE.clear()
+
+
 def get_gemini_client(model_name: str = "gemini-2.5-flash-lite"):
-    """Initialize Google Gemini client."""
+    """Initialize Google Gemini client (reused across calls and reruns)."""
     api_key = get_google_api_key()
     if not api_key:
         return None
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel(model_name)
+    cache_key = (api_key, model_name)
+    if cache_key not in _CLIENT_CACHE:
+        genai.configure(api_key=api_key)
+        _CLIENT_CACHE[cache_key] = genai.GenerativeModel(model_name)
+    return _CLIENT_CACHE[cache_key]
 
 
 def generate_batch_keywords_api(
     model,
     batch_data: List[Dict],
-    batch_id: int
+    batch_id: int,
+    timeout_s: float = 60
 ) -> Dict[str, str]:
     """
     Generate keywords for a batch of products in one API call.
     Uses the new detailed prompt for high-quality, cost-effective generation.
+
+    timeout_s bounds each request so one stuck call cannot hold a worker.
     """
     # Sanitize inputs
     def sanitize(text):
@@ -202,10 +252,12 @@ Return strictly a JSON object mapping ID to the single best search keyword.
             prompt,
             generation_config={
                 "temperature": 0.1,
-                "max_output_tokens": 8192,  # Increased for batch output
+                # ~128 tokens covers one product's entry; cap runaway replies
+                "max_output_tokens": min(8192, max(1024, 128 * len(batch_data))),
                 "response_mime_type": "application/json"
             },
-            safety_settings=safety_settings
+            safety_settings=safety_settings,
+            request_options={"timeout": timeout_s}
         )
         
         if not response.parts or not response.text:
@@ -430,11 +482,18 @@ def generate_keywords_batch(
     delay_between_batches: float = 0.5,
     model_name: str = "gemini-2.5-flash-lite",
     max_products: int = None,
-    max_workers: int = 5
+    max_workers: int = 10,
+    timeout_s: float = 60,
+    max_retries: int = 3
 ) -> pd.DataFrame:
     """
     Generate keywords using Parallel Batch Processing (The Winner).
     Chunks data -> Sends batches in parallel -> Merges results.
+
+    The calls are network-bound, so throughput scales with max_workers until
+    the API quota is hit; 429s are absorbed by the per-batch backoff below.
+    Each call is limited to timeout_s, and a batch is tried at most
+    max_retries times (timeouts come back empty and are retried like gaps).
     """
     model = get_gemini_client(model_name)
     if model is None:
@@ -450,55 +509,68 @@ def generate_keywords_batch(
     else:
         target_df = df
 
-    # Prepare batches
-    # Filter for rows that actually need keywords? Or just specific ones?
-    # For now, process all in target_df
-    
-    indices = target_df.index.tolist()
-    chunks = [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
-    
-    total_items = len(target_df)
-    print(f"Starting PARALLEL BATCH generation for {total_items} items.")
-    print(f"Configuration: {len(chunks)} batches, {batch_size} items/batch, {max_workers} workers.")
+    # Build every batch payload up front from whole columns so the worker
+    # threads only wait on the network (no per-row .loc lookups under the GIL).
+    # Identical title/brand pairs are sent once, and pairs answered in an
+    # earlier run are taken from the cache instead of being sent again.
+    unique_payloads, duplicates = build_unique_payloads(
+        target_df, {"title": 'Product Title', "brand": 'Product Brand'}
+    )
 
     results_map = {}
+    to_send = []
+    for item in unique_payloads:
+        cached = _get_cached_keyword((model_name, item['title'], item['brand']))
+        if cached:
+            results_map[int(item['id'])] = cached
+        else:
+            to_send.append(item)
+
+    payloads = [to_send[i:i + batch_size] for i in range(0, len(to_send), batch_size)]
+
+    total_items = len(to_send)
+    print(f"Starting PARALLEL BATCH generation for {total_items} items "
+          f"({len(target_df) - total_items} duplicates or cached).")
+    print(f"Configuration: {len(payloads)} batches, {batch_size} items/batch, {max_workers} workers.")
+
     errors = []
     
     from concurrent.futures import ThreadPoolExecutor, as_completed
 
-    def process_batch_task(chunk_indices, batch_idx):
-        batch_payload = []
-        for idx in chunk_indices:
-            row = target_df.loc[idx]
-            batch_payload.append({
-                "id": str(idx),
-                "title": str(row.get('Product Title', '')),
-                "brand": str(row.get('Product Brand', ''))
-            })
-            
+    def process_batch_task(batch_payload, batch_idx):
+        batch_results = {}
+        pending = batch_payload
+
         # Retry logic for the batch
-        for attempt in range(3):
+        for attempt in range(max_retries):
             try:
                 # Add delay based on worker usage to avoid initial spike
                 time.sleep(delay_between_batches * attempt)
                 
-                batch_result = generate_batch_keywords_api(model, batch_payload, batch_idx)
-                if batch_result:
-                    return batch_result
+                batch_result = generate_batch_keywords_api(model, pending, batch_idx, timeout_s=timeout_s)
+                # Accept "id_12" as well as "12" (the prompt example uses id_ keys)
+                batch_results.update(
+                    {str(k).removeprefix('id_'): v for k, v in batch_result.items()}
+                )
+
+                # Re-send only the products the model left out of its JSON answer
+                pending = [item for item in pending if item['id'] not in batch_results]
+                if not pending:
+                    break
             except QuotaExceededError:
                 time.sleep(5 * (attempt + 1))  # Specific backoff for quota
             except Exception as e:
                 errors.append(f"Batch {batch_idx} error: {e}")
                 time.sleep(1)
         
-        return {}
+        return batch_results
 
     # Execute
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = {}
-        for i, chunk in enumerate(chunks):
-            future = executor.submit(process_batch_task, chunk, i+1)
-            futures[future] = len(chunk)
+        for i, batch_payload in enumerate(payloads):
+            future = executor.submit(process_batch_task, batch_payload, i+1)
+            futures[future] = len(batch_payload)
             
         completed_items = 0
         
@@ -525,15 +597,61 @@ def generate_keywords_batch(
             except Exception as e:
                 errors.append(f"Future block error: {e}")
 
-    # Apply results
+    # Remember new answers for later runs
+    sent_keys = {int(item['id']): (model_name, item['title'], item['brand']) for item in to_send}
     for idx, keyword in results_map.items():
-        if keyword:
-            df.at[idx, 'Product Keyword'] = keyword
+        if idx in sent_keys:
+            _cache_keyword(sent_keys[idx], keyword)
+
+    # Apply results (and copy them to duplicates) in one assignment
+    keywords = pd.Series({
+        same_idx: keyword
+        for idx, keyword in results_map.items()
+        for same_idx in duplicates.get(idx, ())
+    }, dtype=object)
+    if len(keywords):
+        df.loc[keywords.index, 'Product Keyword'] = keywords
 
     df.attrs['errors'] = errors
     return df
 
 
+def build_unique_payloads(df: pd.DataFrame, fields: Dict[str, str]) -> Tuple[List[Dict], Dict[int, List]]:
+    """
+    Build one LLM payload per distinct product, keyed by DataFrame index.
+
+    Rows whose field values all match an earlier row are not sent again;
+    the LLM answer for the first row is copied to them afterwards.
+
+    Args:
+        df: Rows to send (values are read column-wise and stringified)
+        fields: Payload key -> column name (missing columns become '')
+
+    Returns:
+        Tuple of (payloads with an "id" plus each field,
+                  first row index -> every row index sharing its values)
+    """
+    def column_values(col):
+        if col not in df.columns:
+            return [''] * len(df)
+        return [str(value) for value in df[col].tolist()]
+
+    names = list(fields)
+    payloads = []
+    duplicates = {}
+    first_index = {}
+    for idx, *values in zip(df.index.tolist(), *(column_values(fields[name]) for name in names)):
+        key = tuple(values)
+        if key in first_index:
+            duplicates[first_index[key]].append(idx)
+            continue
+        first_index[key] = idx
+        duplicates[idx] = [idx]
+        payloads.append({"id": str(idx), **dict(zip(names, values))})
+
+    return payloads, duplicates
+
+
 def classify_other_products_batch(
     df: pd.DataFrame,
     product_type: str,
@@ -571,9 +689,9 @@ def classify_other_products_batch(
     else:
         raise Exception("Missing Column: Could not find 'Product Category L3' or 'Product Category' in data.")
 
-    # Filter only "Other" products
+    # Filter only "Other" products (one vectorized comparison, reused below)
     other_mask = df[category_col] == 'Other'
-    other_products = df[other_mask]
+    other_products = df.loc[other_mask]
 
     if len(other_products) == 0:
         # This shouldn't happen if UI showed the button, implies sync issue
@@ -689,9 +807,15 @@ Return ONLY the JSON object."""
         return {}
 
 
+    # Identical title/brand pairs get the same answer, so each is sent once
+    payloads, duplicates = build_unique_payloads(
+        other_products, {"title": 'Product Title', "brand": 'Product Brand'}
+    )
+    if len(payloads) < len(other_products):
+        print(f"Sending {len(payloads)} unique products ({len(other_products) - len(payloads)} duplicates reuse their answers).")
+
     # Create batches
-    indices = other_products.index.tolist()
-    chunks = [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
+    chunks = [payloads[i:i + batch_size] for i in range(0, len(payloads), batch_size)]
     
     results_map = {}  # index -> category
     
@@ -701,22 +825,13 @@ Return ONLY the JSON object."""
         futures = {}
         
         # Submit all batches
-        for i, chunk_indices in enumerate(chunks):
-            batch_payload = []
-            for idx in chunk_indices:
-                row = other_products.loc[idx]
-                batch_payload.append({
-                    "id": str(idx),
-                    "title": str(row.get('Product Title', '')),
-                    "brand": str(row.get('Product Brand', ''))
-                })
-            
+        for i, batch_payload in enumerate(chunks):
             future = executor.submit(process_batch, i+1, batch_payload)
-            futures[future] = len(chunk_indices)
+            futures[future] = len(batch_payload)
 
         # Collect results
         completed_items = 0
-        total_items = len(other_products)
+        total_items = len(payloads)
         
         for future in as_completed(futures):
             # Update progress
@@ -739,14 +854,15 @@ Return ONLY the JSON object."""
             except Exception as e:
                 print(f"Batch failed: {e}")
 
-    # Apply results
-    improved_count = 0
-    for idx, category in results_map.items():
-        try:
-            df.at[idx, category_col] = category
-            improved_count += 1
-        except Exception as e:
-            pass
+    # Apply results (and copy them to duplicates) in one assignment
+    improved = pd.Series({
+        same_idx: category
+        for idx, category in results_map.items()
+        for same_idx in duplicates[idx]
+    }, dtype=object)
+    if len(improved):
+        df.loc[improved.index, category_col] = improved
+    improved_count = len(improved)
 
     print(f"✓ Improved {improved_count} categories from 'Other' using LLM")
 
@@ -873,9 +989,13 @@ Return ONLY the JSON object."""
         
         return {}
 
+    # Identical titles get the same brand, so each is sent once
+    payloads, duplicates = build_unique_payloads(target_products, {"title": 'Product Title'})
+    if len(payloads) < len(target_products):
+        print(f"Sending {len(payloads)} unique titles ({len(target_products) - len(payloads)} duplicates reuse their answers).")
+
     # Create batches
-    indices = target_products.index.tolist()
-    chunks = [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
+    chunks = [payloads[i:i + batch_size] for i in range(0, len(payloads), batch_size)]
     
     results_map = {}  # index -> brand
     
@@ -885,21 +1005,13 @@ Return ONLY the JSON object."""
         futures = {}
         
         # Submit all batches
-        for i, chunk_indices in enumerate(chunks):
-            batch_payload = []
-            for idx in chunk_indices:
-                row = target_products.loc[idx]
-                batch_payload.append({
-                    "id": str(idx),
-                    "title": str(row.get('Product Title', '')),
-                })
-            
+        for i, batch_payload in enumerate(chunks):
             future = executor.submit(process_batch, i+1, batch_payload)
-            futures[future] = len(chunk_indices)
+            futures[future] = len(batch_payload)
 
         # Collect results
         completed_items = 0
-        total_items = len(target_products)
+        total_items = len(payloads)
         
         for future in as_completed(futures):
             # Update progress
@@ -920,14 +1032,15 @@ Return ONLY the JSON object."""
             except Exception as e:
                 print(f"Batch failed: {e}")
 
-    # Apply results
-    improved_count = 0
-    for idx, brand in results_map.items():
-        try:
-            df.at[idx, 'Product Brand'] = brand
-            improved_count += 1
-        except Exception as e:
-            pass
+    # Apply results (and copy them to duplicates) in one assignment
+    improved = pd.Series({
+        same_idx: brand
+        for idx, brand in results_map.items()
+        for same_idx in duplicates.get(idx, ())
+    }, dtype=object)
+    if len(improved):
+        df.loc[improved.index, 'Product Brand'] = improved
+    improved_count = len(improved)
 
     print(f"✓ Extracted {improved_count} brands using LLM")
 
@@ -166,6 +166,7 @@ def clear_taxonomy_cache():
     """Clear the taxonomy cache (useful for testing)."""
     global _TAXONOMY_CACHE
     _TAXONOMY_CACHE = None
+    _PRODUCT_TYPE_CATEGORIES_CACHE.clear()
 
 
 def load_all_categories() -> List[str]:
@@ -201,9 +202,14 @@ def load_all_categories() -> List[str]:
         return sorted(list(all_categories))
 
 
+# Cache of sorted category lists per product type (the sources never change at runtime)
+_PRODUCT_TYPE_CATEGORIES_CACHE: Dict[str, List[str]] = {}
+
+
 def load_categories_for_product_type(product_type: str) -> List[str]:
     """
     Load categories for a specific product type only.
+    Built once per product type; callers get their own copy of the list.
 
     Args:
         product_type: Product type (BWS, Pets, Electronics, etc.)
@@ -211,6 +217,14 @@ def load_categories_for_product_type(product_type: str) -> List[str]:
     Returns:
         List of category names for the specific product type
     """
+    if product_type not in _PRODUCT_TYPE_CATEGORIES_CACHE:
+        _PRODUCT_TYPE_CATEGORIES_CACHE[product_type] = _build_categories_for_product_type(product_type)
+
+    return list(_PRODUCT_TYPE_CATEGORIES_CACHE[product_type])
+
+
+def _build_categories_for_product_type(product_type: str) -> List[str]:
+    """Collect the sorted Level 2/3 category names for a product type."""
     try:
         from .generated_keywords import CATEGORY_KEYWORDS
 
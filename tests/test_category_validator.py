@@ -0,0 +1,68 @@
+"""Tests for the retry behaviour of CategoryValidator._validate_batch."""
+
+from types import SimpleNamespace
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from src.category_validator import CategoryValidator
+
+
+PRODUCTS = [
+    {'title': 'Glenlivet 12', 'brand': 'Glenlivet', 'assigned_category': 'Other'},
+    {'title': 'Peroni 4x330ml', 'brand': 'Peroni', 'assigned_category': 'Beer'},
+]
+CATEGORIES = ['Whisky', 'Beer']
+
+
+class FakeModel:
+    """Returns queued replies in order; exceptions in the queue are raised."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def generate_content(self, *args, **kwargs):
+        self.calls += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(text=reply)
+
+
+def make_validator(model, max_retries=3):
+    validator = CategoryValidator.__new__(CategoryValidator)
+    validator.model = model
+    validator.timeout_s = 1
+    validator.max_retries = max_retries
+    return validator
+
+
+def test_failed_reask_keeps_first_pass_results():
+    # First reply answers product 1 only; re-asking product 2 fails
+    model = FakeModel("1|INCORRECT|Whisky|HIGH", ValueError("unparseable reply"))
+    results = make_validator(model)._validate_batch(PRODUCTS, CATEGORIES)
+
+    assert model.calls == 2
+    assert results[0]['llm_suggested_category'] == 'Whisky'
+    assert results[0]['is_correct'] is False
+    assert results[1]['llm_suggested_category'] == 'Beer'
+    assert results[1]['confidence'] == 'unknown'
+
+
+def test_retries_only_transient_api_errors(monkeypatch):
+    monkeypatch.setattr('src.category_validator.time.sleep', lambda s: None)
+
+    model = FakeModel(
+        google_exceptions.ResourceExhausted("quota"),
+        "1|CORRECT|Whisky|HIGH\n2|CORRECT|Beer|HIGH",
+    )
+    results = make_validator(model)._validate_batch(PRODUCTS, CATEGORIES)
+    assert model.calls == 2
+    assert [r['confidence'] for r in results] == ['high', 'high']
+
+    # A message that merely mentions 429 is not a rate limit
+    model = FakeModel(ValueError("product id 429 not found"))
+    with pytest.raises(ValueError):
+        make_validator(model)._validate_batch(PRODUCTS, CATEGORIES)
+    assert model.calls == 1
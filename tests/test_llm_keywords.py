@@ -0,0 +1,31 @@
+"""Tests for the keyword cache in generate_keywords_batch."""
+
+import pandas as pd
+
+from src import llm_keywords
+
+
+def test_keyword_cache_is_per_model(monkeypatch):
+    calls = []
+
+    def fake_api(model, batch, batch_id, timeout_s=60):
+        calls.append(model)
+        return {item['id']: f"{model} keyword" for item in batch}
+
+    monkeypatch.setattr(llm_keywords, 'get_gemini_client', lambda model_name: model_name)
+    monkeypatch.setattr(llm_keywords, 'generate_batch_keywords_api', fake_api)
+    llm_keywords.clear_keyword_cache()
+
+    df = pd.DataFrame({'Product Title': ['Glenlivet 12'], 'Product Brand': ['Glenlivet']})
+
+    first = llm_keywords.generate_keywords_batch(df, 'Spirits', model_name='model-a')
+    again = llm_keywords.generate_keywords_batch(df, 'Spirits', model_name='model-a')
+    assert calls == ['model-a']
+    assert again['Product Keyword'].tolist() == first['Product Keyword'].tolist() == ['model-a keyword']
+
+    # A different model must not be answered from model-a's cached keywords
+    other = llm_keywords.generate_keywords_batch(df, 'Spirits', model_name='model-b')
+    assert calls == ['model-a', 'model-b']
+    assert other['Product Keyword'].tolist() == ['model-b keyword']
+
+    llm_keywords.clear_keyword_cache()
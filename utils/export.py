@@ -0,0 +1,65 @@
+"""
+Export Module
+Shared download builders and category counts for the consolidated dataset
+"""
+
+import streamlit as st
+import pandas as pd
+from io import BytesIO
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def build_xlsx_bytes(_df: pd.DataFrame, data_version: str) -> bytes:
+    """
+    Build the consolidated Excel export.
+
+    Cached per data_version (state_manager.get_data_version()), not by hashing
+    the frame: Streamlit samples large frames, which misses in-place edits.
+    """
+    df = _df
+    # Column widths are cosmetic, so avoid stringifying the whole frame:
+    # numeric columns are sized from the header, text columns from a sample
+    widths = []
+    for col, series in df.items():
+        if pd.api.types.is_numeric_dtype(series):
+            widths.append(min(len(str(col)) + 2, 20))
+            continue
+        data_length = series.head(1000).astype(str).str.len().max()
+        data_length = int(data_length) if pd.notna(data_length) else 0
+        widths.append(min(max(data_length, len(str(col))) + 2, 50))
+
+    output = BytesIO()
+    # strings_to_urls off: skips xlsxwriter's per-string URL regex check.
+    # (constant_memory is not usable here: to_excel writes column by column,
+    # and that mode silently drops cells written to earlier rows.)
+    with pd.ExcelWriter(
+        output,
+        engine='xlsxwriter',
+        engine_kwargs={'options': {'strings_to_urls': False}}
+    ) as writer:
+        df.to_excel(writer, index=False, sheet_name='Consolidated Data')
+
+        # Auto-adjust column widths
+        worksheet = writer.sheets['Consolidated Data']
+        for idx, width in enumerate(widths):
+            worksheet.set_column(idx, idx, width)
+
+    return output.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def category_level_counts(_df: pd.DataFrame, data_version: str) -> dict:
+    """
+    value_counts of each Product Category L1-L3 column present in the frame.
+
+    Shared by the Phase 1 breakdown and the Phase 2 overview; keyed on
+    data_version like build_xlsx_bytes.
+
+    Returns:
+        Dict mapping level (1, 2, 3) to that level's value_counts
+    """
+    return {
+        level: _df[f'Product Category L{level}'].value_counts()
+        for level in (1, 2, 3)
+        if f'Product Category L{level}' in _df.columns
+    }
@@ -5,19 +5,25 @@ Handles state persistence across pages
 
 import os
 import json
+import uuid
 
 import streamlit as st
 import pandas as pd
 from typing import Optional, Dict, Any
 from datetime import datetime
 
+from src.ingestion import HAS_PYARROW
+
 # ---------------------------------------------------------------------------
 # File-based cache — survives page refreshes / browser reloads
 # ---------------------------------------------------------------------------
 _CACHE_DIR  = os.path.join(os.path.dirname(__file__), '..')
 _CACHE_CSV  = os.path.join(_CACHE_DIR, 'pipeline_cache.csv')
+_CACHE_PARQUET = os.path.join(_CACHE_DIR, 'pipeline_cache.parquet')
 _CACHE_META = os.path.join(_CACHE_DIR, 'pipeline_cache_meta.json')
 
+# Parquet (when HAS_PYARROW) keeps dtypes and reloads much faster than CSV;
+# CSV is the fallback
 _META_KEYS = (
     'product_type',
     'phase_1_complete', 'phase_2_complete',
@@ -25,14 +31,60 @@ _META_KEYS = (
 )
 
 
+def _write_cache_frame(df: pd.DataFrame):
+    """Write the frame as Parquet when possible, otherwise as CSV."""
+    if HAS_PYARROW:
+        try:
+            df.to_parquet(_CACHE_PARQUET, index=False, compression='zstd')
+            stale = _CACHE_CSV
+        except Exception:
+            # Mixed-type object columns can't be stored as Parquet
+            df.to_csv(_CACHE_CSV, index=False)
+            stale = _CACHE_PARQUET
+    else:
+        df.to_csv(_CACHE_CSV, index=False)
+        stale = _CACHE_PARQUET
+    # Drop the other format so _restore() never picks up an older copy
+    if os.path.exists(stale):
+        os.remove(stale)
+
+
+def _read_cache_frame() -> Optional[pd.DataFrame]:
+    """Read whichever cache file _write_cache_frame() left on disk."""
+    if HAS_PYARROW and os.path.exists(_CACHE_PARQUET):
+        return pd.read_parquet(_CACHE_PARQUET)
+    if os.path.exists(_CACHE_CSV):
+        return pd.read_csv(_CACHE_CSV)
+    return None
+
+
+def mark_data_changed():
+    """
+    Give consolidated_df a new version token.
+
+    Cached counts and exports key on this token instead of hashing the frame:
+    Streamlit only samples frames of 50k+ rows, and the pages edit the frame
+    in place with .loc, so a content hash can miss an edit.
+    """
+    st.session_state['data_version'] = uuid.uuid4().hex
+
+
+def get_data_version() -> str:
+    """Version token of the current consolidated_df (see mark_data_changed)."""
+    if 'data_version' not in st.session_state:
+        mark_data_changed()
+    return st.session_state['data_version']
+
+
 def _persist():
-    """Write consolidated_df + key metadata to disk."""
+    """Write consolidated_df + key metadata to disk (the data has changed)."""
+    mark_data_changed()
     df = st.session_state.get('consolidated_df')
     if df is None:
         return
     try:
         df = df.loc[:, ~df.columns.duplicated(keep='first')]
-        df.to_csv(_CACHE_CSV, index=False)
+        _write_cache_frame(df)
         meta = {k: st.session_state.get(k) for k in _META_KEYS}
         with open(_CACHE_META, 'w') as f:
             json.dump(meta, f)
@@ -44,14 +96,17 @@ def _restore():
     """Silently reload session from disk when session is empty."""
     if st.session_state.get('phase_1_complete'):
         return  # session already populated
-    if not (os.path.exists(_CACHE_CSV) and os.path.exists(_CACHE_META)):
+    if not os.path.exists(_CACHE_META):
         return
     try:
-        df = pd.read_csv(_CACHE_CSV)
+        df = _read_cache_frame()
+        if df is None:
+            return
         df = df.loc[:, ~df.columns.duplicated(keep='first')]
         with open(_CACHE_META, 'r') as f:
             meta = json.load(f)
         st.session_state['consolidated_df'] = df
+        mark_data_changed()
         for key in _META_KEYS:
             if key in meta:
                 st.session_state[key] = meta[key]
@@ -198,6 +253,16 @@ def get_phase_status(phase_num: int) -> str:
         return "Pending"
 
 
+def get_all_phase_statuses() -> Dict[int, str]:
+    """
+    Get status for every phase in one call (for the homepage overview)
+
+    Returns:
+        Dictionary mapping phase number (1-5) to status string
+    """
+    return {phase_num: get_phase_status(phase_num) for phase_num in range(1, 6)}
+
+
 def get_session_stats() -> Optional[Dict[str, Any]]:
     """
     Get current session statistics for homepage display
@@ -224,7 +289,7 @@ def clear_session_data():
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     # Remove persisted cache so _restore() won't bring it back
-    for path in (_CACHE_CSV, _CACHE_META):
+    for path in (_CACHE_CSV, _CACHE_PARQUET, _CACHE_META):
         try:
             if os.path.exists(path):
                 os.remove(path)
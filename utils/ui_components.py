@@ -3,7 +3,10 @@ UI Components Module
 Reusable components for consistent modern design across all pages
 """
 
+import time
+
 import streamlit as st
+import pandas as pd
 from typing import Optional, Dict, Any
 
 
@@ -526,3 +529,54 @@ def render_summary_section(title: str, metrics: Dict[str, Any], icon: str = "
             render_metric_card(label, str(display_value), metric_icon)
 
     st.markdown('</div></div>', unsafe_allow_html=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _bar_chart_spec(counts: pd.Series) -> dict:
+    """Vega-Lite spec for a bar chart of counts (built once per distinct counts)."""
+    import altair as alt
+
+    data = pd.DataFrame({'category': counts.index.astype(str), 'count': counts.to_numpy()})
+    chart = alt.Chart(data).mark_bar().encode(
+        x=alt.X('category:N', title=counts.index.name),
+        y=alt.Y('count:Q', title=None),
+        tooltip=['category', 'count']
+    )
+    return chart.to_dict()
+
+
+def render_bar_chart(counts: pd.Series):
+    """
+    Render a bar chart of value counts (e.g. category distribution).
+
+    Same chart as st.bar_chart(counts), but the Altair spec is cached,
+    so reruns with unchanged counts skip re-encoding the chart.
+    """
+    st.vega_lite_chart(_bar_chart_spec(counts), use_container_width=True)
+
+
+def make_throttled_progress(progress_bar, status_text, fmt: str, interval: float = 0.5):
+    """
+    Build a progress_callback(progress, current, total) that updates the UI
+    at most once per interval; the final update always goes through.
+
+    Each update is a message to the browser, and batch helpers may report
+    once per product.
+
+    Args:
+        progress_bar: st.progress element to advance
+        status_text: st.empty placeholder for the status line
+        fmt: Status line template with {current} and {total} placeholders
+        interval: Minimum seconds between updates
+    """
+    last_update = [0.0]
+
+    def update_progress(progress, current, total):
+        now = time.monotonic()
+        if now - last_update[0] < interval and current < total:
+            return
+        last_update[0] = now
+        progress_bar.progress(progress)
+        status_text.text(fmt.format(current=current, total=total))
+
+    return update_progress